@@ -0,0 +1,32 @@
+from __future__ import print_function
+
+import gc
+from timeit import default_timer
+
+
+def best_of(func, repeat=3, setup=None):
+    """Returns the best wall time in seconds over repeated calls to func.
+    If setup is given, it is called untimed before each call and func is
+    passed its return value.
+    """
+    times = []
+
+    for _ in range(repeat):
+        args = () if setup is None else (setup(),)
+
+        # Garbage from the previous call is not charged to this one.
+        gc.collect()
+        start = default_timer()
+        func(*args)
+        times.append(default_timer() - start)
+
+    return min(times)
+
+
+def report(name, seconds, baseline=None):
+    "Prints a timing and the speedup relative to a baseline timing."
+    if baseline:
+        print('{:<32} {:>10.4f}s {:>8.1f}x'.format(name, seconds,
+                                                  baseline / seconds))
+    else:
+        print('{:<32} {:>10.4f}s'.format(name, seconds))
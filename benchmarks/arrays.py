@@ -0,0 +1,47 @@
+"""Compares to_arrays to building edge lists from serialize output in a
+Python loop.
+
+    python -m benchmarks.arrays [nodes] [rels]
+"""
+from __future__ import print_function
+
+import sys
+from graphlib import serialize, deserialize
+from graphlib.csr import to_arrays
+from . import best_of, report
+from .deserialize import payload
+
+
+def edge_lists(node):
+    items = serialize(node)
+    positions = {}
+    types = {}
+    start = []
+    end = []
+    codes = []
+
+    for index, item in enumerate(items):
+        if 'type' in item:
+            start.append(positions[item['start']])
+            end.append(positions[item['end']])
+            codes.append(types.setdefault(item['type'], len(types)))
+        else:
+            positions[index] = len(positions)
+
+    return start, end, codes
+
+
+def main(nodes=100000, rels=300000):
+    print('{} nodes and {} rels'.format(nodes, rels))
+
+    items = payload(nodes, rels)
+    graph = deserialize(items)
+
+    base = best_of(lambda: edge_lists(graph[0]))
+    report('serialize + loop', base)
+    report('to_arrays(node)', best_of(lambda: to_arrays(graph[0])), base)
+    report('to_arrays(payload)', best_of(lambda: to_arrays(items)), base)
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,57 @@
+"""Compares the bulk and the public API paths of deserialize to a loop of
+`Node` and `relate` calls.
+
+    python -m benchmarks.deserialize [nodes] [rels]
+"""
+from __future__ import print_function
+
+import sys
+import random
+from graphlib import Node, deserialize
+from . import best_of, report
+
+
+def payload(nodes, rels, seed=0):
+    "Returns an array format payload with random rels."
+    rand = random.Random(seed)
+    items = [{'props': {'id': i}, 'labels': ['Item']} for i in range(nodes)]
+
+    for i in range(rels):
+        items.append({
+            'start': rand.randrange(nodes),
+            'end': rand.randrange(nodes),
+            'type': 'REL{}'.format(i % 4),
+            'props': {'i': i},
+        })
+
+    return items
+
+
+def relate_loop(items):
+    objects = []
+
+    for item in items:
+        if 'type' in item:
+            start = objects[item['start']]
+            end = objects[item['end']]
+            objects.append(start.relate(end, item['type'], item['props']))
+        else:
+            objects.append(Node(item['props'], labels=item['labels']))
+
+    return objects
+
+
+def main(nodes=100000, rels=300000):
+    items = payload(nodes, rels)
+
+    print('{} nodes and {} rels'.format(nodes, rels))
+
+    base = best_of(lambda: relate_loop(items))
+    report('Node/relate loop', base)
+    report('deserialize(bulk=False)',
+           best_of(lambda: deserialize(items, bulk=False)), base)
+    report('deserialize', best_of(lambda: deserialize(items)), base)
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
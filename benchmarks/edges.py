@@ -0,0 +1,42 @@
+"""Compares relate_many to a loop of `Node.relate` calls. relate_many is
+about 2.5 to 3 times as fast at the default sizes, since the adjacency dict
+updates each rel needs are most of the cost of both.
+
+    python -m benchmarks.edges [nodes] [rels]
+"""
+from __future__ import print_function
+
+import sys
+import random
+from graphlib import Node, relate_many
+from . import best_of, report
+
+
+def edges(nodes, rels, seed=0):
+    "Returns random edges between new nodes."
+    rand = random.Random(seed)
+    nodes = [Node() for _ in range(nodes)]
+
+    return [(nodes[rand.randrange(len(nodes))],
+             nodes[rand.randrange(len(nodes))],
+             'REL{}'.format(i % 4), {'i': i}) for i in range(rels)]
+
+
+def relate_loop(edges):
+    return [start.relate(end, type, props) for start, end, type, props
+            in edges]
+
+
+def main(nodes=100000, rels=300000):
+    print('{} nodes and {} rels'.format(nodes, rels))
+
+    # Fresh nodes for each run so every rel is created.
+    setup = lambda: edges(nodes, rels)
+
+    base = best_of(relate_loop, setup=setup)
+    report('relate loop', base)
+    report('relate_many', best_of(relate_many, setup=setup), base)
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
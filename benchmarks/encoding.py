@@ -0,0 +1,45 @@
+"""Compares the JSON backends on encoding and decoding a large serialized
+payload and on encoding a Neo4j request.
+
+    python -m benchmarks.encoding [nodes] [rels]
+"""
+from __future__ import print_function
+
+import sys
+from graphlib import codec
+from graphlib.neo4j import parse
+from . import best_of, report
+from .deserialize import payload
+
+
+def main(nodes=100000, rels=300000):
+    items = payload(nodes, rels)
+    statements = {'statements': [{'statement': ' '.join(parse(items))}]}
+
+    backends = ['json']
+
+    if codec.orjson is not None:
+        backends.append('orjson')
+
+    print('{} nodes and {} rels'.format(nodes, rels))
+
+    try:
+        baselines = {}
+
+        for name in backends:
+            codec.use(name)
+            data = codec.dumpb(items)
+
+            for case, func in (('dumpb payload', lambda: codec.dumpb(items)),
+                               ('loads payload', lambda: codec.loads(data)),
+                               ('dumpb request',
+                                lambda: codec.dumpb(statements))):
+                seconds = best_of(func)
+                report('{} {}'.format(name, case), seconds,
+                       baselines.setdefault(case, seconds))
+    finally:
+        codec.use()
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,70 @@
+"""Synthetic graphs for the benchmarks. Generators return the number of
+nodes and a list of (start, end, type) edges between node positions so the
+same graph can be built with any API. Random graphs are seeded.
+"""
+from __future__ import division
+
+import random
+from graphlib import Node
+
+
+def chain(n):
+    "Nodes in a line."
+    return n, [(i, i + 1, 'NEXT') for i in range(n - 1)]
+
+
+def star(n):
+    "One node related to all others."
+    return n, [(0, i, 'SPOKE') for i in range(1, n)]
+
+
+def random_graph(n, degree=3, seed=0):
+    "Uniformly random edges of four types with the average out degree."
+    rand = random.Random(seed)
+
+    return n, [(rand.randrange(n), rand.randrange(n), 'REL{}'.format(i % 4))
+               for i in range(n * degree)]
+
+
+def power_law(n, m=2, seed=0):
+    """Preferential attachment where each new node links to m existing
+    nodes chosen in proportion to their degree, giving a power-law degree
+    distribution with a few large hubs.
+    """
+    rand = random.Random(seed)
+    edges = []
+
+    # Each node appears once per rel so sampling is proportional to degree.
+    targets = list(range(m))
+
+    for i in range(m, n):
+        chosen = set()
+
+        while len(chosen) < m:
+            chosen.add(rand.choice(targets))
+
+        for j in chosen:
+            edges.append((i, j, 'LINK'))
+            targets.append(j)
+            targets.append(i)
+
+    return n, edges
+
+
+GRAPHS = {
+    'chain': chain,
+    'star': star,
+    'random': random_graph,
+    'powerlaw': power_law,
+}
+
+
+def build(graph):
+    "Builds nodes for a generated graph using `Node.relate`."
+    n, edges = graph
+    nodes = [Node({'id': i}) for i in range(n)]
+
+    for start, end, type in edges:
+        nodes[start].relate(nodes[end], type)
+
+    return nodes
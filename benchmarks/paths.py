@@ -0,0 +1,83 @@
+"""Compares shortest_path and k_hop to a breadth-first search built on
+`Node.neighbors` over a high fan-out tree.
+
+    python -m benchmarks.paths [fanout] [depth]
+"""
+from __future__ import print_function
+
+import sys
+from collections import deque
+from graphlib import Node, shortest_path, k_hop
+from . import best_of, report
+
+
+def tree(fanout, depth):
+    "Returns the root and leaves of a tree with the fan-out and depth."
+    root = Node()
+    level = [root]
+
+    for _ in range(depth):
+        children = []
+        for node in level:
+            nodes = [Node() for _ in range(fanout)]
+            node.relate(nodes, 'CHILD')
+            children.extend(nodes)
+        level = children
+
+    return root, level
+
+
+def naive_shortest_path(start, end):
+    parents = {start: None}
+    queue = deque([start])
+
+    while queue:
+        node = queue.popleft()
+
+        if node is end:
+            path = []
+            while node is not None:
+                path.append(node)
+                node = parents[node]
+            return path[::-1]
+
+        for other in node.neighbors:
+            if other not in parents:
+                parents[other] = node
+                queue.append(other)
+
+
+def naive_k_hop(node, k):
+    seen = {node}
+    level = [node]
+
+    for _ in range(k):
+        _level = []
+        for n in level:
+            for other in n.neighbors:
+                if other not in seen:
+                    seen.add(other)
+                    _level.append(other)
+        level = _level
+
+    seen.discard(node)
+    return seen
+
+
+def main(fanout=30, depth=3):
+    root, leaves = tree(fanout, depth)
+    start, end = leaves[0], leaves[-1]
+
+    print('Tree with fan-out {} and depth {}'.format(fanout, depth))
+
+    base = best_of(lambda: naive_shortest_path(start, end))
+    report('naive shortest path', base)
+    report('shortest_path', best_of(lambda: shortest_path(start, end)), base)
+
+    base = best_of(lambda: naive_k_hop(root, depth - 1))
+    report('naive k-hop', base)
+    report('k_hop', best_of(lambda: k_hop(root, depth - 1)), base)
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,97 @@
+"""Compares pattern matching with `Matcher` to nested loops over the nodes
+of a social graph of people living in cities.
+
+    python -m benchmarks.query [people] [cities]
+"""
+from __future__ import print_function
+
+import sys
+import random
+from graphlib import Node
+from graphlib.query import Matcher, parse, _node_matches, _props_match
+from . import best_of, report
+
+
+def social(people, cities, knows=5, seed=0):
+    "Returns the people and cities of a generated social graph."
+    rng = random.Random(seed)
+    _cities = [Node({'location': 'City {}'.format(i)}, labels=['City'])
+               for i in range(cities)]
+    _people = [Node({'name': 'Person {}'.format(i)}, labels=['Person'])
+               for i in range(people)]
+
+    for person in _people:
+        person.relate(rng.choice(_cities), 'LIVES_IN')
+        person.relate(rng.sample(_people, knows), 'KNOWS')
+
+    return _people, _cities
+
+
+def _rel(start, end, pattern):
+    "Returns the rel between two nodes matching a pattern or None."
+    adjacent = []
+
+    if pattern.direction is None or pattern.direction > 0:
+        adjacent.append(start._outgoing.get(end, {}))
+    if pattern.direction is None or pattern.direction < 0:
+        adjacent.append(start._incoming.get(end, {}))
+
+    for rels in adjacent:
+        for rel in rels.values():
+            if pattern.types and rel.type not in pattern.types:
+                continue
+            if pattern.props and not _props_match(rel.props, pattern.props):
+                continue
+            return rel
+
+
+def nested_loops(pattern, nodes):
+    "Matches a pattern by trying every node for each node pattern."
+    pattern = parse(pattern)
+    results = []
+
+    def visit(i, path):
+        for node in nodes:
+            if not _node_matches(node, pattern.nodes[i]):
+                continue
+
+            if i and _rel(path[-1], node, pattern.rels[i - 1]) is None:
+                continue
+
+            if i + 1 == len(pattern.nodes):
+                results.append(path + [node])
+            else:
+                visit(i + 1, path + [node])
+
+    visit(0, [])
+    return results
+
+
+QUERIES = (
+    ('person in city', "(a:Person)-[:LIVES_IN]->(c {location: 'City 0'})"),
+    ('friends of', "(a {name: 'Person 0'})-[:KNOWS]->(b)-[:LIVES_IN]->(c)"),
+)
+
+
+def main(people=2000, cities=50):
+    nodes = [n for group in social(people, cities) for n in group]
+
+    print('{} people in {} cities'.format(people, cities))
+
+    report('build matcher', best_of(lambda: Matcher(nodes)))
+    matcher = Matcher(nodes)
+
+    for name, pattern in QUERIES:
+        count = len(nested_loops(pattern, nodes))
+        assert count == len(list(matcher.match(pattern)))
+
+        base = best_of(lambda: nested_loops(pattern, nodes))
+        report('nested loops ' + name, base)
+        report('match ' + name,
+               best_of(lambda: list(matcher.match(pattern))), base)
+        report('one-off match ' + name,
+               best_of(lambda: list(Matcher(nodes).match(pattern))), base)
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
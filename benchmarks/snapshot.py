@@ -0,0 +1,60 @@
+"""Compares opening a binary snapshot to parsing and deserializing the same
+graph from JSON.
+
+    python -m benchmarks.snapshot [nodes] [rels]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+from graphlib import deserialize
+from graphlib.binary import write, read
+from . import best_of, report
+from .deserialize import payload
+
+
+def load_json(path):
+    with open(path) as f:
+        return deserialize(json.load(f))
+
+
+def open_snapshot(path, nodes=0):
+    with read(path) as s:
+        for id in range(nodes):
+            s.node(id).degree
+
+
+def main(nodes=100000, rels=300000):
+    items = payload(nodes, rels)
+    dir = tempfile.mkdtemp()
+
+    try:
+        json_path = os.path.join(dir, 'graph.json')
+        bin_path = os.path.join(dir, 'graph.bin')
+
+        with open(json_path, 'w') as f:
+            json.dump(items, f)
+
+        write(items, bin_path)
+
+        print('{} nodes and {} rels, {:.1f}MB JSON, {:.1f}MB snapshot'.format(
+            nodes, rels, os.path.getsize(json_path) / 1e6,
+            os.path.getsize(bin_path) / 1e6))
+
+        base = best_of(lambda: load_json(json_path))
+        report('json.load + deserialize', base)
+        report('snapshot open', best_of(lambda: open_snapshot(bin_path)),
+               base)
+        report('snapshot open + 1000 nodes',
+               best_of(lambda: open_snapshot(bin_path, 1000)), base)
+        report('snapshot open + all nodes',
+               best_of(lambda: open_snapshot(bin_path, nodes)), base)
+    finally:
+        shutil.rmtree(dir)
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
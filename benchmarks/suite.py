@@ -0,0 +1,187 @@
+"""Benchmark suite for graph building, serialization and Cypher generation
+over synthetic graphs. Records the best time, throughput and peak memory of
+each case as JSON and compares them to a baseline from a previous run.
+
+    python -m benchmarks.suite [--sizes 10000,100000] [--graphs chain,star]
+        [--cases relate,serialize] [--output results.json]
+        [--baseline baseline.json] [--threshold 0.2]
+
+Sizes up to 1000000 are supported but take minutes per case. The exit
+status is 1 if any case is slower than the baseline by more than the
+threshold.
+"""
+from __future__ import print_function, division
+
+import sys
+import json
+import time
+import argparse
+import platform
+from graphlib import Nodes, Serializer
+from graphlib.serializer import convert_array_to_dict
+from . import best_of
+from .generators import GRAPHS, build
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    from graphlib import neo4j
+except ImportError:
+    neo4j = None
+
+
+def _relate(graph):
+    return len(graph[1]), lambda: graph, build
+
+
+def _rels(graph):
+    nodes = build(graph)
+
+    def run(nodes):
+        for node in nodes:
+            node.rels()
+
+    return len(nodes), lambda: nodes, run
+
+
+def _dictseq(graph):
+    nodes = build(graph)
+    return len(nodes), lambda: nodes, Nodes
+
+
+def _serialize(graph):
+    nodes = build(graph)
+    return len(nodes) + len(graph[1]), lambda: nodes, \
+        lambda nodes: Serializer().serialize(nodes)
+
+
+def _convert(graph):
+    items = Serializer().serialize(build(graph))
+    return len(items), lambda: items, convert_array_to_dict
+
+
+def _parse(graph):
+    items = Serializer().serialize(build(graph))
+    return len(items), lambda: items, neo4j.parse
+
+
+# Each case takes a generated graph and returns the number of items
+# processed, a setup function and the function to time, which is passed
+# the result of the setup.
+CASES = {
+    'relate': _relate,
+    'rels': _rels,
+    'dictseq': _dictseq,
+    'serialize': _serialize,
+    'convert': _convert,
+    'parse': _parse,
+}
+
+
+def peak_memory(func, setup):
+    "Returns the peak bytes allocated by a call to func."
+    if tracemalloc is None:
+        return None
+
+    args = setup()
+    tracemalloc.start()
+
+    try:
+        func(args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(cases, graphs, sizes, repeat=3):
+    "Runs the cases and returns the results by case, graph and size."
+    results = {}
+
+    for size in sizes:
+        for graph_name in graphs:
+            graph = GRAPHS[graph_name](size)
+
+            for case in cases:
+                if case == 'parse' and neo4j is None:
+                    continue
+
+                items, setup, func = CASES[case](graph)
+                seconds = best_of(func, repeat=repeat, setup=setup)
+                name = '{}/{}/{}'.format(case, graph_name, size)
+
+                results[name] = {
+                    'seconds': seconds,
+                    'items': items,
+                    'throughput': items / seconds if seconds else None,
+                    'peak_memory': peak_memory(func, setup),
+                }
+
+                print('{:<32} {:>10.4f}s {:>12.0f}/s'.format(
+                    name, seconds, results[name]['throughput'] or 0))
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Prints the ratio of each time to the baseline and returns the names
+    of the cases slower by more than the threshold.
+    """
+    regressions = []
+
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+
+        ratio = results[name]['seconds'] / baseline[name]['seconds']
+        flag = ''
+
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = ' regression'
+
+        print('{:<32} {:>8.2f}x baseline{}'.format(name, ratio, flag))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', default='10000,100000')
+    parser.add_argument('--graphs', default=','.join(sorted(GRAPHS)))
+    parser.add_argument('--cases', default=','.join(sorted(CASES)))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='path to write the results to')
+    parser.add_argument('--baseline', help='results of a previous run')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='slowdown reported as a regression')
+    args = parser.parse_args(argv)
+
+    results = run(args.cases.split(','), args.graphs.split(','),
+                  [int(s) for s in args.sizes.split(',')], args.repeat)
+
+    output = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+        if compare(results, baseline, args.threshold):
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
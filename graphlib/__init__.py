@@ -19,5 +19,7 @@ def get_version(short=False):
 __version__ = get_version()
 
 
-from .graph import Node, Nodes, Rel, Rels  # noqa
-from .serializer import serialize, Serializer  # noqa
+from .graph import (Node, Nodes, Rel, Rels, shortest_path, k_hop,  # noqa
+                    relate_many, from_edges, NodeRegistry, snapshot,
+                    restore)
+from .serializer import serialize, deserialize, Serializer  # noqa
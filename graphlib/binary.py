@@ -0,0 +1,534 @@
+"""Binary snapshot format for serialized graphs.
+
+A snapshot is written from the output of the serializer and read through
+a memory map, so opening one only reads the header. Nodes and rels are
+materialized on access.
+
+All integers are little-endian. The file starts with a header of counts and
+section offsets followed by the sections:
+
+- strings: offsets into the UTF-8 data of property keys, labels and types
+- lists: offsets into arrays of string ids for labels and match and update
+  keys
+- nodes: fixed-width records of list ids and a property blob reference
+- rels: fixed-width records sorted by start node with the start and end
+  node ids, the type string id, list ids and a property blob reference
+- out: offsets of the rels of each node, which are contiguous
+- in: offsets into an array of rel ids sorted by end node
+- blobs: packed properties
+"""
+from __future__ import unicode_literals, absolute_import
+
+import json
+import mmap
+import struct
+import numbers
+from collections import defaultdict
+from .graph import Node, Rel, TYPES, ADJACENCY, intern_labels
+from .serializer import split
+
+# Alias str to unicode with unicode_literals imported
+try:
+    str = unicode
+except NameError:
+    pass
+
+
+MAGIC = b'GLIB'
+VERSION = 1
+
+# Magic, version, flags, string, list, node and rel counts, and the offsets
+# of the strings, lists, nodes, rels, out, in and blobs sections.
+HEADER = struct.Struct('<4sHHIIII7Q')
+
+# Labels, match and update list ids, blob offset and length.
+NODE = struct.Struct('<IIIQI')
+
+# Start, end, type, match and update list ids, blob offset and length.
+REL = struct.Struct('<IIIIIQI')
+
+OFFSET = struct.Struct('<Q')
+ID = struct.Struct('<I')
+INT = struct.Struct('<q')
+FLOAT = struct.Struct('<d')
+
+# List ids of an absent list and of a list that is False, which marks
+# items that are created rather than merged.
+NONE = 0xFFFFFFFF
+FALSE = 0xFFFFFFFE
+
+INT_MIN = -2 ** 63
+INT_MAX = 2 ** 63 - 1
+
+
+class _Writer(object):
+    def __init__(self):
+        self.strings = {}
+        self.lists = {}
+        self.blobs = bytearray()
+
+    def string(self, value):
+        id = self.strings.get(value)
+
+        if id is None:
+            id = self.strings[value] = len(self.strings)
+
+        return id
+
+    def string_list(self, values):
+        if values is None:
+            return NONE
+
+        if values is False:
+            return FALSE
+
+        key = tuple(self.string(str(v)) for v in values)
+        id = self.lists.get(key)
+
+        if id is None:
+            id = self.lists[key] = len(self.lists)
+
+        return id
+
+    def value(self, value, out):
+        if value is None:
+            out += b'N'
+        elif value is True:
+            out += b'T'
+        elif value is False:
+            out += b'F'
+        elif isinstance(value, numbers.Integral):
+            if INT_MIN <= value <= INT_MAX:
+                out += b'i'
+                out += INT.pack(value)
+            else:
+                self.pack_bytes(b'I', str(value).encode('ascii'), out)
+        elif isinstance(value, float):
+            out += b'd'
+            out += FLOAT.pack(value)
+        elif isinstance(value, str):
+            self.pack_bytes(b's', value.encode('utf-8'), out)
+        elif isinstance(value, bytes):
+            self.pack_bytes(b'b', value, out)
+        elif isinstance(value, (list, tuple)):
+            out += b'l'
+            out += ID.pack(len(value))
+
+            for v in value:
+                self.value(v, out)
+        else:
+            self.pack_bytes(b'j', json.dumps(value).encode('utf-8'), out)
+
+    def pack_bytes(self, tag, value, out):
+        out += tag
+        out += ID.pack(len(value))
+        out += value
+
+    def props(self, props):
+        "Packs the props into the blobs and returns the offset and length."
+        blobs = self.blobs
+        offset = len(blobs)
+
+        props = props or {}
+        blobs += ID.pack(len(props))
+
+        for key, value in props.items():
+            blobs += ID.pack(self.string(str(key)))
+            self.value(value, blobs)
+
+        return offset, len(blobs) - offset
+
+
+def dump(data, f):
+    """Writes serialized data in the array or dict format to a binary file
+    object as a snapshot.
+    """
+    nodes, rels = split(data)
+    writer = _Writer()
+    pack_list = writer.string_list
+
+    node_records = bytearray()
+
+    for node in nodes:
+        offset, length = writer.props(node.get('props'))
+        node_records += NODE.pack(pack_list(node.get('labels') or None),
+                                  pack_list(node.get('match')),
+                                  pack_list(node.get('update')),
+                                  offset, length)
+
+    # Rels are stored by start node so the outgoing rels of a node are
+    # contiguous. The sort is stable to keep the order within a node.
+    rels.sort(key=lambda r: int(r['start']))
+
+    rel_records = bytearray()
+    out_offsets = [0] * (len(nodes) + 1)
+    in_rels = defaultdict(list)
+
+    for id, rel in enumerate(rels):
+        start = int(rel['start'])
+        end = int(rel['end'])
+        offset, length = writer.props(rel.get('props'))
+        rel_records += REL.pack(start, end, writer.string(str(rel['type'])),
+                                pack_list(rel.get('match')),
+                                pack_list(rel.get('update')),
+                                offset, length)
+        out_offsets[start + 1] += 1
+        in_rels[end].append(id)
+
+    for i in range(len(nodes)):
+        out_offsets[i + 1] += out_offsets[i]
+
+    in_offsets = [0]
+    in_ids = bytearray()
+
+    for i in range(len(nodes)):
+        for id in in_rels.get(i, ()):
+            in_ids += ID.pack(id)
+        in_offsets.append(in_offsets[-1] + len(in_rels.get(i, ())))
+
+    strings = sorted(writer.strings, key=writer.strings.get)
+    lists = sorted(writer.lists, key=writer.lists.get)
+
+    sections = [
+        _table([s.encode('utf-8') for s in strings]),
+        _table([b''.join(ID.pack(i) for i in ids) for ids in lists], ID.size),
+        node_records,
+        rel_records,
+        b''.join(OFFSET.pack(o) for o in out_offsets),
+        b''.join(OFFSET.pack(o) for o in in_offsets) + in_ids,
+        writer.blobs,
+    ]
+
+    offsets = []
+    offset = HEADER.size
+
+    for section in sections:
+        offsets.append(offset)
+        offset += len(section)
+
+    f.write(HEADER.pack(MAGIC, VERSION, 0, len(strings), len(lists),
+                        len(nodes), len(rels), *offsets))
+
+    for section in sections:
+        f.write(section)
+
+
+def _table(values, size=1):
+    "Packs values preceded by the offsets of each in units of size."
+    offsets = [0]
+
+    for value in values:
+        offsets.append(offsets[-1] + len(value) // size)
+
+    return b''.join(OFFSET.pack(o) for o in offsets) + b''.join(values)
+
+
+def write(data, path):
+    "Writes serialized data to a snapshot file."
+    with open(path, 'wb') as f:
+        dump(data, f)
+
+
+class SnapshotNode(Node):
+    """Node read from a snapshot. Its relationships are read on first
+    access. Afterwards it behaves as any other node.
+    """
+    _snapshot = None
+
+    def __getattr__(self, name):
+        # Only called for missing attributes.
+        if name in ADJACENCY and self._snapshot is not None:
+            self._snapshot._load(self)
+            return self.__dict__[name]
+        raise AttributeError(name)
+
+
+class Snapshot(object):
+    """Snapshot file opened with a memory map. Nodes are identified by
+    their position in the serialized data and rels by their position in
+    the file. Each is materialized once on first access.
+    """
+    def __init__(self, path, nodeclass=SnapshotNode, relclass=Rel):
+        self.path = path
+        self.nodeclass = nodeclass
+        self.relclass = relclass
+
+        self._file = open(path, 'rb')
+        self.buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header = HEADER.unpack_from(self.buf, 0)
+
+        if header[0] != MAGIC:
+            self.close()
+            raise ValueError('{} is not a graph snapshot'.format(path))
+
+        if header[1] != VERSION:
+            self.close()
+            raise ValueError('unsupported snapshot version {}'
+                             .format(header[1]))
+
+        (self.num_strings, self.num_lists, self.num_nodes,
+         self.num_rels) = header[3:7]
+
+        (self._strings_offset, self._lists_offset, self._nodes_offset,
+         self._rels_offset, self._out_offset, self._in_offset,
+         self._blobs_offset) = header[7:]
+
+        self._strings = {}
+        self._lists = {}
+        self._nodes = {}
+        self._rels = {}
+
+    def __len__(self):
+        return self.num_nodes
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Closes the file. Materialized nodes remain usable but cannot load
+        relationships that were not accessed.
+        """
+        self.buf.close()
+        self._file.close()
+
+    def _offset(self, base, index):
+        return OFFSET.unpack_from(self.buf, base + OFFSET.size * index)[0]
+
+    def _string(self, id):
+        value = self._strings.get(id)
+
+        if value is None:
+            base = self._strings_offset
+            data = base + OFFSET.size * (self.num_strings + 1)
+            start = self._offset(base, id)
+            end = self._offset(base, id + 1)
+            value = self.buf[data + start:data + end].decode('utf-8')
+            self._strings[id] = value
+
+        return value
+
+    def _list(self, id):
+        if id == NONE:
+            return None
+
+        if id == FALSE:
+            return False
+
+        values = self._lists.get(id)
+
+        if values is None:
+            base = self._lists_offset
+            data = base + OFFSET.size * (self.num_lists + 1)
+            start = self._offset(base, id)
+            end = self._offset(base, id + 1)
+            ids = (ID.unpack_from(self.buf, data + ID.size * i)[0]
+                   for i in range(start, end))
+            values = tuple(self._string(i) for i in ids)
+            self._lists[id] = values
+
+        return list(values)
+
+    def _value(self, pos):
+        buf = self.buf
+        tag = buf[pos:pos + 1]
+        pos += 1
+
+        if tag == b'N':
+            return None, pos
+        if tag == b'T':
+            return True, pos
+        if tag == b'F':
+            return False, pos
+        if tag == b'i':
+            return INT.unpack_from(buf, pos)[0], pos + INT.size
+        if tag == b'd':
+            return FLOAT.unpack_from(buf, pos)[0], pos + FLOAT.size
+
+        length = ID.unpack_from(buf, pos)[0]
+        pos += ID.size
+
+        if tag == b'l':
+            values = []
+
+            for _ in range(length):
+                value, pos = self._value(pos)
+                values.append(value)
+
+            return values, pos
+
+        value = buf[pos:pos + length]
+        pos += length
+
+        if tag == b's':
+            return value.decode('utf-8'), pos
+        if tag == b'b':
+            return value, pos
+        if tag == b'I':
+            return int(value.decode('ascii')), pos
+        if tag == b'j':
+            return json.loads(value.decode('utf-8')), pos
+
+        raise ValueError('invalid value tag {}'.format(repr(tag)))
+
+    def _props(self, offset):
+        "Unpacks the props at an offset into the blobs section."
+        pos = self._blobs_offset + offset
+        count = ID.unpack_from(self.buf, pos)[0]
+        pos += ID.size
+        props = {}
+
+        for _ in range(count):
+            key = self._string(ID.unpack_from(self.buf, pos)[0])
+            props[key], pos = self._value(pos + ID.size)
+
+        return props
+
+    def node(self, id):
+        "Returns the node with the id."
+        node = self._nodes.get(id)
+
+        if node is not None:
+            return node
+
+        if not 0 <= id < self.num_nodes:
+            raise IndexError(id)
+
+        labels, match, update, offset, _ = NODE.unpack_from(
+            self.buf, self._nodes_offset + NODE.size * id)
+
+        cls = self.nodeclass
+        node = cls.__new__(cls)
+        node.__dict__ = {
+            'props': self._props(offset),
+            '_snapshot': self,
+            '_snapshot_id': id,
+        }
+
+        if labels != NONE:
+            node.labels = intern_labels(self._list(labels))
+        if match != NONE:
+            node.match_props = self._list(match)
+        if update != NONE:
+            node.update_props = self._list(update)
+
+        self._nodes[id] = node
+        return node
+
+    def rel(self, id):
+        "Returns the rel with the id."
+        rel = self._rels.get(id)
+
+        if rel is not None:
+            return rel
+
+        if not 0 <= id < self.num_rels:
+            raise IndexError(id)
+
+        start, end, type, match, update, offset, _ = REL.unpack_from(
+            self.buf, self._rels_offset + REL.size * id)
+
+        cls = self.relclass
+        rel = cls.__new__(cls)
+        rel.__dict__ = {
+            'start': self.node(start),
+            'end': self.node(end),
+            'type': TYPES.intern(self._string(type)),
+            'props': self._props(offset),
+        }
+
+        if match != NONE:
+            rel.match_props = self._list(match)
+        if update != NONE:
+            rel.update_props = self._list(update)
+
+        self._rels[id] = rel
+        return rel
+
+    def _out_rels(self, id):
+        start = self._offset(self._out_offset, id)
+        end = self._offset(self._out_offset, id + 1)
+        return range(start, end)
+
+    def _in_rels(self, id):
+        start = self._offset(self._in_offset, id)
+        end = self._offset(self._in_offset, id + 1)
+        data = self._in_offset + OFFSET.size * (self.num_nodes + 1)
+        return [ID.unpack_from(self.buf, data + ID.size * i)[0]
+                for i in range(start, end)]
+
+    def _load(self, node):
+        "Loads the relationships of a node."
+        id = node._snapshot_id
+
+        outgoing = defaultdict(dict)
+        incoming = defaultdict(dict)
+        types = defaultdict(set)
+
+        for rel_id in self._out_rels(id):
+            rel = self.rel(rel_id)
+            outgoing[rel.end][rel.type] = rel
+            types[rel.type].add(rel.end)
+
+        for rel_id in self._in_rels(id):
+            rel = self.rel(rel_id)
+            incoming[rel.start][rel.type] = rel
+            types[rel.type].add(rel.start)
+
+        node.__dict__.update({
+            '_outgoing': outgoing,
+            '_incoming': incoming,
+            '_types': types,
+        })
+
+    def nodes(self):
+        "Iterates over the nodes."
+        for id in range(self.num_nodes):
+            yield self.node(id)
+
+    def items(self):
+        """Iterates over the data in the array-based format of the JSON
+        Graph Spec without materializing the nodes, nodes first.
+        """
+        buf = self.buf
+
+        for id in range(self.num_nodes):
+            labels, match, update, offset, _ = NODE.unpack_from(
+                buf, self._nodes_offset + NODE.size * id)
+
+            data = {'props': self._props(offset)}
+
+            if labels != NONE:
+                data['labels'] = self._list(labels)
+            if match != NONE:
+                data['match'] = self._list(match)
+            if update != NONE:
+                data['update'] = self._list(update)
+
+            yield data
+
+        for id in range(self.num_rels):
+            start, end, type, match, update, offset, _ = REL.unpack_from(
+                buf, self._rels_offset + REL.size * id)
+
+            data = {
+                'start': start,
+                'end': end,
+                'type': self._string(type),
+                'props': self._props(offset),
+            }
+
+            if match != NONE:
+                data['match'] = self._list(match)
+            if update != NONE:
+                data['update'] = self._list(update)
+
+            yield data
+
+
+def read(path, **kwargs):
+    "Opens a snapshot file."
+    return Snapshot(path, **kwargs)
@@ -0,0 +1,79 @@
+"""JSON encoding and decoding used by the serializer, the Neo4j loader and
+the CLI. The fastest installed backend is used, orjson if available,
+otherwise the standard library. Another can be selected with `use`.
+"""
+from __future__ import unicode_literals, absolute_import
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+BACKENDS = ('orjson', 'json')
+
+_backend = None
+
+
+def use(name=None):
+    "Selects a backend by name or the fastest installed one if None."
+    global _backend
+
+    if name is None:
+        name = 'orjson' if orjson is not None else 'json'
+
+    if name not in BACKENDS:
+        raise ValueError('backend must be one of {}'
+                         .format(', '.join(BACKENDS)))
+
+    if name == 'orjson' and orjson is None:
+        raise ImportError('The orjson library is not installed.')
+
+    _backend = name
+
+
+def backend():
+    "Returns the name of the backend in use."
+    return _backend
+
+
+def dumpb(value):
+    "Encodes a value as UTF-8 JSON bytes."
+    if _backend == 'orjson':
+        try:
+            return orjson.dumps(value)
+        except TypeError:
+            # Values orjson does not support, such as integers larger than
+            # 64 bits, are encoded by the standard library.
+            pass
+
+    return json.dumps(value).encode('utf-8')
+
+
+def dumps(value):
+    "Encodes a value as a JSON string."
+    if _backend == 'orjson':
+        return dumpb(value).decode('utf-8')
+
+    return json.dumps(value)
+
+
+def loads(data):
+    "Decodes JSON from a string or UTF-8 bytes."
+    if _backend == 'orjson':
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            # Also raised for integers larger than 64 bits, which the
+            # standard library decodes.
+            pass
+
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+
+    return json.loads(data)
+
+
+use()
@@ -0,0 +1,228 @@
+from __future__ import unicode_literals, absolute_import
+
+import operator
+
+try:
+    import numpy
+except ImportError:
+    raise ImportError('The numpy library is required to use the '
+                      'columnar module.')
+
+# Alias str to unicode with unicode_literals imported
+try:
+    str = unicode
+except NameError:
+    pass
+
+
+# Comparison operators supported by `Columns.where`
+OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+def _dtype(values):
+    "Returns the narrowest array type and fill value for the values."
+    if not values:
+        return object, None
+
+    if all(isinstance(v, bool) for v in values):
+        return bool, False
+
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return numpy.int64, 0
+
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool)
+           for v in values):
+        return numpy.float64, numpy.nan
+
+    return object, None
+
+
+class Column(object):
+    """Values of a property as an array with a mask of the items the
+    property is present on. Values of missing items are undefined.
+    """
+    def __init__(self, key, values, mask):
+        self.key = key
+        self.values = values
+        self.mask = mask
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        return '{}({}, {})'.format(self.__class__.__name__, repr(self.key),
+                                   self.values.dtype)
+
+    @classmethod
+    def extract(cls, items, key):
+        "Extracts the values of a property from a container of items."
+        key = str(key)
+        present = []
+        values = []
+
+        for item in items:
+            value = item.props.get(key)
+
+            if value is None:
+                present.append(False)
+                values.append(None)
+            else:
+                present.append(True)
+                values.append(value)
+
+        mask = numpy.array(present, dtype=bool)
+        dtype, fill = _dtype([v for v in values if v is not None])
+
+        array = None
+
+        if dtype is not object:
+            try:
+                array = numpy.array([fill if v is None else v
+                                     for v in values], dtype=dtype)
+            except OverflowError:
+                pass
+
+        if array is None:
+            # Assigned one by one so lists are not treated as dimensions.
+            array = numpy.empty(len(values), dtype=object)
+            for i, value in enumerate(values):
+                array[i] = value
+
+        return cls(key, array, mask)
+
+    def compare(self, op, value):
+        "Returns a mask of the items whose value compares true to value."
+        func = OPERATORS[op]
+        result = numpy.zeros(len(self.values), dtype=bool)
+        result[self.mask] = func(self.values[self.mask], value)
+        return result
+
+
+class Columns(object):
+    """Columnar view of a container of items. The given properties are
+    extracted into arrays so filtering, sorting and aggregation run
+    vectorized. Results are mapped back to a container of the same class
+    as the source.
+
+    The view reflects the property values at the time it was built.
+    """
+    def __init__(self, items, keys):
+        self.items = items
+        self.columns = {}
+
+        for key in keys:
+            column = Column.extract(items, key)
+            self.columns[column.key] = column
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, key):
+        return self.columns[str(key)]
+
+    def __contains__(self, key):
+        return str(key) in self.columns
+
+    def take(self, positions):
+        "Returns a container with the items at the positions."
+        get = tuple.__getitem__
+        items = self.items
+        return items.__class__(get(items, i) for i in positions)
+
+    def select(self, mask):
+        "Returns a container with the items selected by a boolean mask."
+        return self.take(numpy.flatnonzero(mask).tolist())
+
+    def where(self, key, op, value):
+        """Returns a boolean mask of the items whose property compares true
+        to value using one of the operators in `OPERATORS`. Masks can be
+        combined with `&`, `|` and `~` before being passed to `select`.
+        """
+        return self[key].compare(op, value)
+
+    def filter(self, key, value=None):
+        """Filters the items and returns a new container. Mirrors
+        `DictSeq.filter` for the key and value shorthand.
+        """
+        column = self[key]
+
+        if value is None:
+            return self.select(column.mask)
+
+        return self.select(column.compare('==', value))
+
+    def argsort(self, key, reverse=False):
+        """Returns the positions of the items ordered by the property.
+        Items missing the property are placed last.
+        """
+        column = self[key]
+        present = numpy.flatnonzero(column.mask)
+        missing = numpy.flatnonzero(~column.mask)
+
+        order = numpy.argsort(column.values[present], kind='stable')
+
+        if reverse:
+            order = order[::-1]
+
+        return numpy.concatenate([present[order], missing])
+
+    def sort(self, key, reverse=False):
+        "Sorts the items by property and returns a new container."
+        return self.take(self.argsort(key, reverse=reverse).tolist())
+
+    def _present(self, key, mask):
+        column = self[key]
+
+        if mask is None:
+            return column.values[column.mask]
+
+        return column.values[column.mask & mask]
+
+    def count(self, key, mask=None):
+        "Returns the number of items having the property."
+        column = self[key]
+
+        if mask is None:
+            return int(column.mask.sum())
+
+        return int((column.mask & mask).sum())
+
+    def sum(self, key, mask=None):
+        return self._present(key, mask).sum()
+
+    def mean(self, key, mask=None):
+        values = self._present(key, mask)
+
+        if not len(values):
+            return None
+
+        return values.mean()
+
+    def min(self, key, mask=None):
+        values = self._present(key, mask)
+
+        if not len(values):
+            return None
+
+        return values.min()
+
+    def max(self, key, mask=None):
+        values = self._present(key, mask)
+
+        if not len(values):
+            return None
+
+        return values.max()
+
+    def counts(self, key, mask=None):
+        "Returns a dict of distinct property values and their counts."
+        values, counts = numpy.unique(self._present(key, mask),
+                                      return_counts=True)
+        return dict(zip(values.tolist(), counts.tolist()))
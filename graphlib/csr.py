@@ -0,0 +1,356 @@
+from __future__ import unicode_literals, absolute_import
+
+from array import array
+from collections import deque
+from itertools import chain
+from .graph import Node, Nodes, Rels, OUTGOING, INCOMING, _component_of
+from .serializer import node_data, rel_data, iter_array_to_dict
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Type code for the integer arrays
+ARRAY_TYPE = 'l'
+
+
+def _to_numpy(a):
+    "Returns a NumPy view of the array without copying."
+    return numpy.frombuffer(a, dtype='i{}'.format(a.itemsize))
+
+
+class CSRGraph(object):
+    """Read-only snapshot of a graph in compressed sparse row form. Nodes
+    are identified by integer ids and rel types by integer codes. Rels are
+    identified by their position in the outgoing arrays.
+
+    The outgoing targets of node `i` are `out_targets[out_offsets[i]:
+    out_offsets[i + 1]]` with the types in `out_types` at the same positions.
+    The incoming arrays are laid out the same way with `in_rels` holding the
+    rel ids for each position.
+
+    The arrays are `array.array` instances or NumPy arrays if NumPy is
+    installed. `Node` and `Rel` objects can be retrieved by id.
+    """
+    def __init__(self, nodes, types, rels, out_offsets, out_targets,
+                 out_types, in_offsets, in_targets, in_types, in_rels):
+        self.nodes = nodes
+        self.types = types
+        self.rels = rels
+
+        self.out_offsets = out_offsets
+        self.out_targets = out_targets
+        self.out_types = out_types
+
+        self.in_offsets = in_offsets
+        self.in_targets = in_targets
+        self.in_types = in_types
+        self.in_rels = in_rels
+
+        self._ids = None
+        self._codes = None
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __repr__(self):
+        return '{}({} nodes, {} rels)'.format(self.__class__.__name__,
+                                              len(self.nodes), len(self.rels))
+
+    def id(self, node):
+        "Returns the id of a node."
+        if self._ids is None:
+            self._ids = {n: i for i, n in enumerate(self.nodes)}
+        return self._ids[node]
+
+    def code(self, type):
+        "Returns the code of a rel type."
+        if self._codes is None:
+            self._codes = {t: i for i, t in enumerate(self.types)}
+        return self._codes[type]
+
+    def node(self, id):
+        return self.nodes[id]
+
+    def rel(self, id):
+        return self.rels[id]
+
+    def out_degree(self, id):
+        return int(self.out_offsets[id + 1] - self.out_offsets[id])
+
+    def in_degree(self, id):
+        return int(self.in_offsets[id + 1] - self.in_offsets[id])
+
+    def degree(self, id):
+        """Returns the number of rels of the node. Unlike `Node.degree`,
+        this counts rels rather than distinct neighbors.
+        """
+        return self.out_degree(id) + self.in_degree(id)
+
+    def edges(self, id, type=None, direction=None):
+        """Iterates over the rels of a node as (rel id, other node id,
+        type code) tuples, optionally filtered by type and direction.
+        Like `Node.rels`, a type not in the graph has no rels.
+        """
+        code = None
+
+        if type is not None:
+            try:
+                code = self.code(type)
+            except KeyError:
+                return
+
+        if not direction or direction == OUTGOING:
+            start = self.out_offsets[id]
+            end = self.out_offsets[id + 1]
+
+            for pos in range(start, end):
+                if code is None or self.out_types[pos] == code:
+                    yield pos, int(self.out_targets[pos]), \
+                        int(self.out_types[pos])
+
+        if not direction or direction == INCOMING:
+            start = self.in_offsets[id]
+            end = self.in_offsets[id + 1]
+
+            for pos in range(start, end):
+                if code is None or self.in_types[pos] == code:
+                    yield int(self.in_rels[pos]), int(self.in_targets[pos]), \
+                        int(self.in_types[pos])
+
+    def neighbors(self, id, type=None, direction=None):
+        "Returns the distinct ids of the neighboring nodes."
+        seen = set()
+        ids = []
+
+        for _, other, _ in self.edges(id, type, direction):
+            if other not in seen:
+                seen.add(other)
+                ids.append(other)
+
+        return ids
+
+    def traverse(self, id, type=None, direction=None, max_depth=None):
+        "Yields the ids of the nodes reachable from a node breadth-first."
+        seen = {id}
+        queue = deque([(id, 0)])
+
+        while queue:
+            id, depth = queue.popleft()
+            yield id
+
+            if max_depth is not None and depth >= max_depth:
+                continue
+
+            for _, other, _ in self.edges(id, type, direction):
+                if other not in seen:
+                    seen.add(other)
+                    queue.append((other, depth + 1))
+
+    def to_nodes(self, ids):
+        "Returns a Nodes container for the node ids."
+        return Nodes(self.nodes[i] for i in ids)
+
+    def to_rels(self, ids):
+        "Returns a Rels container for the rel ids."
+        return Rels(self.rels[i] for i in ids)
+
+    def serialize(self):
+        """Returns the graph in the array-based format of the JSON Graph Spec.
+        Nodes are output first so their indexes are equal to their ids.
+        """
+        items = [node_data(node) for node in self.nodes]
+
+        for id in range(len(self.nodes)):
+            start = self.out_offsets[id]
+            end = self.out_offsets[id + 1]
+
+            for pos in range(start, end):
+                items.append(rel_data(self.rels[pos], id,
+                                      int(self.out_targets[pos])))
+
+        return items
+
+
+def freeze(items):
+    """Compiles the graphs connected to one or more nodes into a `CSRGraph`.
+    Changes to the nodes after freezing are not reflected in the snapshot.
+    """
+    if isinstance(items, Node):
+        items = [items]
+
+    nodes, ids = _component_of(items)
+
+    types = []
+    codes = {}
+    rels = []
+    rel_ids = {}
+
+    out_offsets = array(ARRAY_TYPE, [0])
+    out_targets = array(ARRAY_TYPE)
+    out_types = array(ARRAY_TYPE)
+
+    for node in nodes:
+        for other, _rels in node._outgoing.items():
+            target = ids.get(other)
+
+            for type, rel in _rels.items():
+                code = codes.get(type)
+
+                if code is None:
+                    code = codes[type] = len(types)
+                    types.append(type)
+
+                rel_ids[rel] = len(rels)
+                rels.append(rel)
+                out_targets.append(target)
+                out_types.append(code)
+
+        out_offsets.append(len(rels))
+
+    in_offsets = array(ARRAY_TYPE, [0])
+    in_targets = array(ARRAY_TYPE)
+    in_types = array(ARRAY_TYPE)
+    in_rels = array(ARRAY_TYPE)
+
+    for node in nodes:
+        for other, _rels in node._incoming.items():
+            target = ids.get(other)
+
+            for type, rel in _rels.items():
+                in_rels.append(rel_ids[rel])
+                in_targets.append(target)
+                in_types.append(codes[type])
+
+        in_offsets.append(len(in_rels))
+
+    arrays = [out_offsets, out_targets, out_types,
+              in_offsets, in_targets, in_types, in_rels]
+
+    if numpy is not None:
+        arrays = [_to_numpy(a) for a in arrays]
+
+    return CSRGraph(nodes, types, rels, *arrays)
+
+
+def _node_edges(roots, start, end, type_codes, code):
+    "Collects the edges of the graphs connected to the roots in one pass."
+    ids = {}
+    nodes = []
+    queue = deque()
+
+    def visit(node):
+        if node not in ids:
+            ids[node] = len(nodes)
+            nodes.append(node)
+            queue.append(node)
+
+    for root in roots:
+        visit(root)
+
+        while queue:
+            node = queue.popleft()
+            id = ids[node]
+
+            for other, rels in node._outgoing.items():
+                if not rels:
+                    continue
+
+                visit(other)
+                target = ids[other]
+
+                for type in rels:
+                    start.append(id)
+                    end.append(target)
+                    type_codes.append(code(type))
+
+            for other, rels in node._incoming.items():
+                if rels:
+                    visit(other)
+
+    return nodes
+
+
+def _data_edges(data, start, end, type_codes, code):
+    "Collects the edges of serialized data in either format."
+    if isinstance(data, dict):
+        pairs = chain((('nodes', node) for node in data.get('nodes', ())),
+                      (('rels', rel) for rel in data.get('rels', ())))
+    else:
+        pairs = iter_array_to_dict(data)
+
+    nodes = []
+
+    for key, item in pairs:
+        if key == 'nodes':
+            nodes.append(item)
+        else:
+            start.append(int(item['start']))
+            end.append(int(item['end']))
+            type_codes.append(code(item['type']))
+
+    return nodes
+
+
+def to_arrays(items):
+    """Exports the edges of a graph as `start`, `end` and `type_code`
+    integer arrays. `items` is a node or an iterable of nodes, in which case
+    the graphs connected to them are included, or serialized data: a dict
+    in the dict format or an iterable of items in the array format. Any
+    iterable is accepted, including generators such as the output of
+    `neo4j.coalesce`, and serialized data is read in one pass.
+
+    Returns the three arrays and the lookup tables `nodes` and `types`. The
+    node ids in `start` and `end` are positions in `nodes`, which holds the
+    `Node` objects or the node data, and the codes are positions in `types`.
+
+    The arrays are NumPy arrays sharing memory with the packed arrays if
+    NumPy is installed, so they can be passed directly to SciPy:
+
+        start, end, type_code, nodes, types = to_arrays(node)
+        matrix = coo_matrix((numpy.ones(len(start)), (start, end)),
+                            shape=(len(nodes), len(nodes)))
+    """
+    start = array(ARRAY_TYPE)
+    end = array(ARRAY_TYPE)
+    type_codes = array(ARRAY_TYPE)
+
+    types = []
+    codes = {}
+
+    def code(type):
+        _code = codes.get(type)
+
+        if _code is None:
+            _code = codes[type] = len(types)
+            types.append(type)
+
+        return _code
+
+    first = None
+
+    if isinstance(items, Node):
+        first = items
+        items = [items]
+    elif not isinstance(items, dict):
+        # The first item is put back so iterators are read once.
+        items = iter(items)
+        first = next(items, None)
+
+        if first is not None:
+            items = chain((first,), items)
+
+    if isinstance(items, dict) or \
+            (first is not None and not isinstance(first, Node)):
+        nodes = _data_edges(items, start, end, type_codes, code)
+    else:
+        nodes = _node_edges(items, start, end, type_codes, code)
+
+    arrays = [start, end, type_codes]
+
+    if numpy is not None:
+        arrays = [_to_numpy(a) for a in arrays]
+
+    return tuple(arrays) + (nodes, types)
@@ -2,12 +2,6 @@
 
 from __future__ import unicode_literals, absolute_import
 
-try:
-    import requests
-except ImportError:
-    raise ImportError('The requests library is required to use the '
-                      'Neo4j exporter module.')
-
 # Alias str to unicode with unicode_literals imported
 try:
     str = unicode
@@ -15,7 +9,13 @@ except NameError:
     pass
 
 
-import json
+from array import array
+from timeit import default_timer
+from itertools import chain
+from collections import OrderedDict
+from .transport import default_transport
+from .codec import dumpb, loads
+from .serializer import split
 
 
 # Default URI to Neo4j REST endpoint
@@ -32,6 +32,16 @@ MERGE_NODE_STMT = 'MERGE ({ref}{labels}{props}){oncreate}{onmatch}'
 CREATE_REL_STMT = 'CREATE ({start})-[{ref}:{rtype}{props}]->({end})'
 MERGE_REL_STMT = 'MERGE ({start})-[{ref}:{rtype}{props}]->({end}){oncreate}{onmatch}'  # noqa
 
+# Cypher statement templates for removing items
+MATCH_NODE_STMT = 'OPTIONAL MATCH ({ref}{labels}{props})'
+MATCH_NODE_RELS_STMT = 'OPTIONAL MATCH ({ref})-[{rref}]-()'
+MATCH_REL_STMT = 'OPTIONAL MATCH ({start}{slabels}{sprops})-[{ref}:{rtype}{props}]->({end}{elabels}{eprops})'  # noqa
+DELETE_STMT = 'DELETE {refs}'
+
+# Ends the removals in a statement and reduces the rows to one so
+# subsequent updates are applied once.
+END_DELETE_STMT = 'WITH count(*) AS {ref}'
+
 # Supported property value types:
 # http://docs.neo4j.org/chunked/2.0.0/graphdb-neo4j-properties.html
 VALID_TYPES = (bool, int, float, str, bytes)
@@ -148,13 +158,24 @@ def merge_rel_stmt(index, n1, rtype, n2, props=None, cprops=None, uprops=None,
                                  onmatch=onmatch)
 
 
-def send_request(uri, statements):
-    "Sends a request to the transaction endpoint."
+def send_request(uri, statements, stats=None, transport=None):
+    """Sends a request to the transaction endpoint using a transport from
+    `graphlib.transport`, by default a shared keep-alive `HTTPTransport`.
+
+    If a `graphlib.stats.Stats` instance is passed, the encoding and request
+    times and the size of the request are recorded as a batch.
+    """
+    if transport is None:
+        transport = default_transport()
+
     if not uri:
         uri = DEFAULT_URI
     url = TRANSACTION_URI_TMPL.format(uri)
 
-    data = json.dumps({
+    if stats is not None:
+        start = default_timer()
+
+    data = dumpb({
         'statements': [{'statement': ' '.join(statements)}]
     })
 
@@ -163,9 +184,21 @@ def send_request(uri, statements):
         'content-type': 'application/json',
     }
 
-    resp = requests.post(url, data=data, headers=headers)
-    resp.raise_for_status()
-    return resp.json()
+    if stats is not None:
+        sent = default_timer()
+        stats.add_time('encode', sent - start)
+
+    body = transport.post(url, data, headers)
+    output = loads(body)
+
+    if stats is not None:
+        seconds = default_timer() - sent
+        stats.add_time('request', seconds)
+        stats.incr('requests')
+        stats.incr('bytes', len(data))
+        stats.add_batch('request', len(statements), seconds, len(data))
+
+    return output
 
 
 def pick(props, keys):
@@ -216,6 +249,16 @@ def clean_props(props):
     return copy
 
 
+def _clean_props(props, stats):
+    if stats is None:
+        return clean_props(props)
+
+    start = default_timer()
+    props = clean_props(props)
+    stats.add_time('clean', default_timer() - start)
+    return props
+
+
 def parse_match_props(match, props):
     if not match:
         return {}
@@ -232,7 +275,7 @@ def parse_update_props(update, props):
     raise ValueError('update must be None or a list of keys')
 
 
-def parse_node(index, node):
+def parse_node(index, node, stats=None):
     props = node.get('props', {})
     match = node.get('match')
     update = node.get('update')
@@ -242,7 +285,7 @@ def parse_node(index, node):
     assert type(replace) is bool, 'replace must be a boolean'
 
     # Clean the properties and ensure the values are valid
-    props = clean_props(props)
+    props = _clean_props(props, stats)
 
     mprops = parse_match_props(match, props)
 
@@ -257,7 +300,7 @@ def parse_node(index, node):
                            labels=labels, replace=replace)
 
 
-def parse_rel(index, rel, bound):
+def parse_rel(index, rel, bound, stats=None):
     start = int(rel.get('start'))
     end = int(rel.get('end'))
     rtype = rel.get('type')
@@ -274,7 +317,7 @@ def parse_rel(index, rel, bound):
     assert type(replace) is bool, 'replace must be a boolean'
 
     # Clean the properties and ensure the values are valid
-    props = clean_props(props)
+    props = _clean_props(props, stats)
 
     # Force create the relationship is match is disabled
     if match is False:
@@ -291,65 +334,511 @@ def parse_rel(index, rel, bound):
                           uprops=uprops, replace=replace)
 
 
-def _parse_dict_schema(data, stream):
-    "Parses a dict-based format with `nodes` and `rels` arrays."
+def _iter_parsed(data, stats=None):
+    "Yields the items of either format with their statements."
+    if isinstance(data, dict):
+        nodes = data.get('nodes', ())
+        rels = data.get('rels', ())
+
+        for index, node in enumerate(nodes):
+            yield node, parse_node(index, node, stats)
+
+        # References to nodes in relationships cannot exceed
+        # this upper bound, offset if for generating references
+        offset = len(nodes)
+        bound = offset - 1
+
+        for index, rel in enumerate(rels):
+            yield rel, parse_rel(offset + index, rel, bound, stats)
+
+    elif hasattr(data, '__iter__') and not isinstance(data, (str, bytes)):
+        # Lists or iterators of items in the array-based format where nodes
+        # and relationships are interleaved.
+        for index, item in enumerate(data):
+            if 'type' in item:
+                yield item, parse_rel(index, item, index, stats)
+            else:
+                yield item, parse_node(index, item, stats)
+
+    else:
+        raise ValueError('Invalid format. Must be a dict or list/tuple')
+
+
+def parse(data, stream=False, stats=None):
+    """Converts data in either format into Cypher statements. If a
+    `graphlib.stats.Stats` instance is passed, the time spent and the number
+    of statements are recorded along with the time spent cleaning props.
+    """
+    if stats is not None:
+        start = default_timer()
+
     statements = []
+    count = 0
 
-    nodes = data.get('nodes', ())
-    rels = data.get('rels', ())
+    for _, stmt in _iter_parsed(data, stats):
+        count += 1
 
-    for index, node in enumerate(nodes):
-        stmt = parse_node(index, node)
         if stream:
             print(stmt)
         else:
             statements.append(stmt)
 
-    # References to nodes in relationships cannot exceed
-    # this upper bound, offset if for generating references
-    offset = len(nodes)
+    if stats is not None:
+        stats.add_time('parse', default_timer() - start)
+        stats.incr('statements', count)
+
+    return statements
+
+
+def _index_key(labels, keys):
+    return ':' + ':'.join(labels) + '(' + ', '.join(keys) + ')'
+
+
+def plan(data, indexes=None):
+    """Computes what loading the data would do without building the
+    statement list or contacting the server. Statements are generated one at
+    a time in a single pass over the data.
+
+    Returns a dict with the number of nodes, rels and statements, the
+    number of transactions and the size in bytes of the request `load`
+    would send, the number of MERGE and CREATE statements for nodes and
+    rels, the counts of each label and rel type, and warnings.
+
+    `indexes` is an iterable of (label, key) pairs known to be indexed.
+    A warning is output for each combination of labels and match keys of
+    node MERGEs that cannot use one of them.
+    """
+    indexed = set(tuple(index) for index in indexes or ())
+
+    counts = {'nodes': 0, 'rels': 0}
+    operations = {
+        'nodes': {'MERGE': 0, 'CREATE': 0},
+        'rels': {'MERGE': 0, 'CREATE': 0},
+    }
+    labels = {}
+    types = {}
+    unindexed = OrderedDict()
+    size = 0
+
+    for item, stmt in _iter_parsed(data):
+        kind = 'rels' if 'type' in item else 'nodes'
+        operation = 'MERGE' if stmt.startswith('MERGE') else 'CREATE'
+
+        counts[kind] += 1
+        operations[kind][operation] += 1
+
+        # Size of the statement in the JSON request including the space
+        # separating it from the previous one.
+        size += len(dumpb(stmt)) - 1
+
+        if kind == 'rels':
+            types[item['type']] = types.get(item['type'], 0) + 1
+            continue
+
+        _labels = item.get('labels') or ()
+
+        for label in _labels:
+            labels[label] = labels.get(label, 0) + 1
+
+        if operation == 'MERGE':
+            keys = tuple(item['match'])
+
+            if not any((label, key) in indexed
+                       for label in _labels for key in keys):
+                key = _index_key(_labels, keys)
+                unindexed[key] = unindexed.get(key, 0) + 1
+
+    statements = counts['nodes'] + counts['rels']
+
+    # The statements are joined into one string in a single request.
+    request = dumpb({'statements': [{'statement': ''}]})
+    size += len(request) - 1 if statements else len(request)
+
+    warnings = []
+
+    for key, count in unindexed.items():
+        if key.startswith(':('):
+            warnings.append('{} MERGE statements on nodes without labels '
+                            'match on {} and cannot use an index'
+                            .format(count, key[1:]))
+        else:
+            warnings.append('{} MERGE statements match on {} which is not '
+                            'indexed'.format(count, key))
+
+    return {
+        'nodes': counts['nodes'],
+        'rels': counts['rels'],
+        'statements': statements,
+        'transactions': 1 if statements else 0,
+        'bytes': size,
+        'operations': operations,
+        'labels': labels,
+        'types': types,
+        'warnings': warnings,
+    }
+
+
+def _print_plan(plan):
+    "Prints a plan as a report."
+    print('Nodes: {nodes}\nRels: {rels}\nStatements: {statements}\n'
+          'Transactions: {transactions}\nBytes: {bytes}'.format(**plan))
+
+    for kind in ('nodes', 'rels'):
+        ops = plan['operations'][kind]
+        print('{} statements: {} MERGE, {} CREATE'.format(
+            kind[:-1].capitalize(), ops['MERGE'], ops['CREATE']))
+
+    for title, counts in (('Labels', plan['labels']),
+                          ('Types', plan['types'])):
+        if counts:
+            print('{}:'.format(title))
+
+            for key, count in sorted(counts.items(), key=lambda x: -x[1]):
+                print('  {} {}'.format(key, count))
+
+    for warning in plan['warnings']:
+        print('Warning: {}'.format(warning))
+
+
+def load(data, uri=DEFAULT_URI, stats=None, transport=None):
+    statements = parse(data, stats=stats)
+    return send_request(uri, statements, stats=stats, transport=transport)
+
+
+def _freeze(props):
+    "Returns a hashable representation of a dict of property values."
+    if not props:
+        return ()
+
+    return tuple(sorted((k, tuple(v) if isinstance(v, list) else v)
+                        for k, v in props.items()))
+
+
+def _identity(match, props):
+    """Returns the properties an item is identified by: the match properties
+    or all properties if matching is disabled or no match properties exist.
+    """
+    if match is False:
+        return props
+
+    return parse_match_props(match, props) or props
+
+
+class _Item(object):
+    "Parsed node or relationship used for diffing."
+    def __init__(self, data, props, mprops, key, start=None, end=None):
+        self.data = data
+        self.props = props
+        self.mprops = mprops
+        self.key = key
+        self.start = start
+        self.end = end
+
+
+def _diff_nodes(nodes):
+    items = []
+    keys = {}
+
+    for node in nodes:
+        props = clean_props(node.get('props')) or {}
+        labels = tuple(node.get('labels') or ())
+        mprops = _identity(node.get('match'), props)
+
+        item = _Item(node, props, mprops, (labels, _freeze(mprops)))
+        keys[item.key] = item
+        items.append(item)
+
+    return items, keys
+
+
+def _diff_rels(rels, nodes):
+    items = []
+    keys = {}
+
+    for rel in rels:
+        props = clean_props(rel.get('props')) or {}
+        match = rel.get('match')
+
+        # Without match keys relationships are identified by type alone.
+        if match is None:
+            mprops = {}
+        else:
+            mprops = _identity(match, props)
+
+        start = nodes[int(rel['start'])]
+        end = nodes[int(rel['end'])]
+
+        key = (start.key, rel['type'], end.key, _freeze(mprops))
+        item = _Item(rel, props, mprops, key, start, end)
+
+        keys[item.key] = item
+        items.append(item)
+
+    return items, keys
+
+
+def _updated_props(old, new):
+    """Returns the properties to set on match and whether all properties
+    must be replaced since some were removed.
+    """
+    update = new.data.get('update')
+    replace = new.data.get('replace', False)
+
+    if replace or any(key not in new.props for key in old.props):
+        return new.props, True
+
+    uprops = {}
+
+    for key, value in new.props.items():
+        if old.props.get(key) != value:
+            uprops[key] = value
+
+    if update:
+        uprops = {key: uprops[key] for key in update if key in uprops}
+
+    return uprops, False
+
+
+def _bind_node_stmt(index, node):
+    "Returns a statement binding an existing node to a reference."
+    return merge_node_stmt(index, node.mprops, labels=node.data.get('labels'))
+
+
+def _match_node_stmt(ref, node):
+    labels = labels_suffix(node.data.get('labels'))
+    props = dict_props(node.mprops)
+    return MATCH_NODE_STMT.format(ref=ref, labels=labels, props=props)
+
+
+def _match_rel_stmt(ref, rel):
+    return MATCH_REL_STMT.format(
+        ref=ref, rtype=rel.data['type'], props=dict_props(rel.mprops),
+        start='', slabels=labels_suffix(rel.start.data.get('labels')),
+        sprops=dict_props(rel.start.mprops),
+        end='', elabels=labels_suffix(rel.end.data.get('labels')),
+        eprops=dict_props(rel.end.mprops))
+
+
+def diff(old, new):
+    """Returns the statements needed to change a graph loaded from the old
+    data into the graph described by the new data. Either may use the array
+    or dict format.
+
+    Nodes are matched by labels and match properties, or all properties if
+    they have none. Relationships are matched by their nodes, type and match
+    properties. Added items are merged, changed items have their properties
+    set and removed items are deleted along with the relationships of
+    removed nodes.
+    """
+    old_nodes, old_rels = split(old)
+    new_nodes, new_rels = split(new)
+
+    old_nodes, old_node_keys = _diff_nodes(old_nodes)
+    new_nodes, new_node_keys = _diff_nodes(new_nodes)
+
+    old_rels, old_rel_keys = _diff_rels(old_rels, old_nodes)
+    new_rels, new_rel_keys = _diff_rels(new_rels, new_nodes)
+
+    offset = len(new_nodes)
     bound = offset - 1
 
-    for index, rel in enumerate(rels):
-        stmt = parse_rel(offset + index, rel, bound)
-        if stream:
-            print(stmt)
+    # References for removals start after the new items.
+    ref_index = offset + len(new_rels)
+
+    statements = []
+
+    # Each removal ends with its own delete which reduces the rows to one,
+    # so the rows matched by removals are not multiplied together.
+    for rel in old_rels:
+        if rel.key in new_rel_keys:
+            continue
+
+        ref = cref(ref_index)
+        ref_index += 2
+
+        statements.append(_match_rel_stmt(ref, rel))
+        statements.append(DELETE_STMT.format(refs=ref))
+        statements.append(END_DELETE_STMT.format(ref=cref(ref_index - 1)))
+
+    for node in old_nodes:
+        if node.key in new_node_keys:
+            continue
+
+        ref = cref(ref_index)
+        rref = ref + 'r'
+        ref_index += 2
+
+        statements.append(_match_node_stmt(ref, node))
+        statements.append(MATCH_NODE_RELS_STMT.format(ref=ref, rref=rref))
+        statements.append(DELETE_STMT.format(refs=', '.join([rref, ref])))
+        statements.append(END_DELETE_STMT.format(ref=cref(ref_index - 1)))
+
+    # Nodes referenced by new or changed relationships must be bound
+    # even if they did not change.
+    rel_statements = []
+    bind = set()
+
+    for index, rel in enumerate(new_rels):
+        _old = old_rel_keys.get(rel.key)
+
+        if _old is None:
+            stmt = parse_rel(offset + index, rel.data, bound)
+        elif _old.props != rel.props:
+            uprops, replace = _updated_props(_old, rel)
+            stmt = merge_rel_stmt(offset + index, rel.data['start'],
+                                  rel.data['type'], rel.data['end'],
+                                  rel.mprops or None, cprops=rel.props,
+                                  uprops=uprops, replace=replace)
         else:
-            statements.append(stmt)
+            continue
+
+        rel_statements.append(stmt)
+        bind.add(int(rel.data['start']))
+        bind.add(int(rel.data['end']))
+
+    for index, node in enumerate(new_nodes):
+        _old = old_node_keys.get(node.key)
+
+        if _old is None:
+            statements.append(parse_node(index, node.data))
+        elif _old.props != node.props:
+            uprops, replace = _updated_props(_old, node)
+            statements.append(merge_node_stmt(
+                index, node.mprops, cprops=node.props, uprops=uprops,
+                labels=node.data.get('labels'), replace=replace))
+        elif index in bind:
+            statements.append(_bind_node_stmt(index, node))
+
+    statements.extend(rel_statements)
 
     return statements
 
 
-def _parse_array_schema(data, stream):
-    """Parses the array-based format where nodes and relationships are
-    interleaved.
+def _coalesce_key(item, start=None, end=None):
+    """Returns the key of items that merge the same node or relationship or
+    None if the item is always created.
     """
-    statements = []
+    props = item.get('props') or {}
+    match = item.get('match')
+    extra = (_freeze_keys(item.get('update')), item.get('replace', False))
+
+    if 'type' in item:
+        if match is False:
+            return None
+        mprops = parse_match_props(match, props)
+        return (start, end, item['type'], _freeze(mprops)) + extra
+
+    mprops = parse_match_props(match, props)
+
+    if match is False or not mprops:
+        return None
+
+    labels = frozenset(item.get('labels') or ())
+    return (labels, _freeze(mprops)) + extra
+
+
+def _freeze_keys(keys):
+    if isinstance(keys, list):
+        return tuple(keys)
+    return keys
+
+
+def _fold(item, other):
+    "Returns a copy of item with the properties of other folded in."
+    item = dict(item)
+
+    if other.get('replace'):
+        item['props'] = other.get('props') or {}
+    else:
+        props = dict(item.get('props') or {})
+        oprops = other.get('props') or {}
+
+        if other.get('update'):
+            oprops = pick(oprops, other['update'])
+
+        # None values are removed when parsed so they do not override.
+        props.update((k, v) for k, v in oprops.items() if v is not None)
+        item['props'] = props
+
+    return item
+
+
+def coalesce(data, size=10000):
+    """Merges items that would MERGE the same node or relationship into one
+    item and yields the items in the array-based format. Nodes are the same
+    if they have the same labels and match properties. Relationships are
+    the same if they have the same (merged) nodes, type and match properties.
+    Properties of later items are folded into the first like consecutive
+    MERGE statements would do.
+
+    Items are streamed through a buffer of `size` items and only duplicates
+    within `size` distinct recent keys are merged, so memory is bounded
+    apart from a compact remap table of one integer per item. The input is
+    not modified.
+    """
+    if isinstance(data, dict):
+        data = chain(data.get('nodes', ()), data.get('rels', ()))
+
+    # Canonical input index of each item and the output index of each
+    # canonical item once it is emitted.
+    canon = array('l')
+    out = array('l')
+
+    pending = OrderedDict()
+    keys = OrderedDict()
+    emitted = [0]
+
+    def emit(index, item):
+        out[index] = emitted[0]
+        emitted[0] += 1
+
+        if 'type' in item:
+            item = dict(item)
+            item['start'] = out[item['start']]
+            item['end'] = out[item['end']]
+
+        return item
 
     for index, item in enumerate(data):
+        canon.append(index)
+        out.append(-1)
+
         if 'type' in item:
-            stmt = parse_rel(index, item, index)
+            start = canon[int(item['start'])]
+            end = canon[int(item['end'])]
+            key = _coalesce_key(item, start, end)
+
+            # Pending rels reference canonical input indexes.
+            item = dict(item)
+            item['start'] = start
+            item['end'] = end
         else:
-            stmt = parse_node(index, item)
-        if stream:
-            print(stmt)
-        else:
-            statements.append(stmt)
+            key = _coalesce_key(item)
 
-    return statements
+        if key is not None and key in keys:
+            first = keys.pop(key)
 
+            if first in pending:
+                canon[index] = first
+                pending[first] = _fold(pending[first], item)
 
-def parse(data, stream=False):
-    if isinstance(data, dict):
-        return _parse_dict_schema(data, stream)
-    elif isinstance(data, (list, tuple)):
-        return _parse_array_schema(data, stream)
-    raise ValueError('Invalid format. Must be a dict or list/tuple')
+                # Most recently used
+                keys[key] = first
+                continue
 
+        if key is not None:
+            keys[key] = index
 
-def load(data, uri=DEFAULT_URI):
-    statements = parse(data)
-    return send_request(uri, statements)
+            if len(keys) > size:
+                keys.popitem(last=False)
+
+        pending[index] = item
+
+        if len(pending) > size:
+            yield emit(*pending.popitem(last=False))
+
+    while pending:
+        yield emit(*pending.popitem(last=False))
 
 
 if __name__ == '__main__':
@@ -363,12 +852,53 @@ if __name__ == '__main__':
     else:
         _load = False
 
+    if '--coalesce' in args:
+        args.remove('--coalesce')
+        _coalesce = True
+    else:
+        _coalesce = False
+
+    if '--plan' in args:
+        args.remove('--plan')
+        _plan = True
+    else:
+        _plan = False
+
+    # Comma-separated Label.key pairs that are indexed for the plan
+    if '--indexes' in args:
+        index = args.index('--indexes')
+        args.pop(index)
+        indexes = [i.split('.', 1) for i in args.pop(index).split(',')]
+    else:
+        indexes = None
+
+    # Path to JSON file of the previous data to diff against
+    if '--diff' in args:
+        index = args.index('--diff')
+        args.pop(index)
+        with open(args.pop(index), 'rb') as f:
+            previous = loads(f.read())
+    else:
+        previous = None
+
     # Path to JSON file, otherwise assume stdin
     if args:
-        with open(args.pop(0)) as f:
-            data = json.load(f)
+        with open(args.pop(0), 'rb') as f:
+            data = loads(f.read())
     else:
-        data = json.load(sys.stdin)
+        data = loads(getattr(sys.stdin, 'buffer', sys.stdin).read())
+
+    if _coalesce:
+        data = coalesce(data)
+
+    if _plan:
+        _print_plan(plan(data, indexes=indexes))
+        sys.exit(0)
+
+    if previous is not None:
+        statements = diff(previous, data)
+    else:
+        statements = None
 
     if _load:
         # Args remaining, this should be a custom URI
@@ -377,11 +907,17 @@ if __name__ == '__main__':
         else:
             uri = None
 
-        output = load(data, uri=uri)
+        if statements is not None:
+            output = send_request(uri, statements)
+        else:
+            output = load(data, uri=uri)
 
         # Print errors if any were returned
         if output['errors']:
             print(output['errors'])
             sys.exit(1)
+    elif statements is not None:
+        for stmt in statements:
+            print(stmt)
     else:
         parse(data, stream=True)
@@ -0,0 +1,526 @@
+"""Pattern matching over graphs of nodes in memory.
+
+Patterns use a subset of the Cypher syntax, a path of node patterns joined
+by relationship patterns:
+
+    (a:Person {name: 'Jane'})-[r:LIVES_IN]->(c:City)<-[:LIVES_IN]-(b)
+
+Node patterns may have a variable, labels and properties. Relationship
+patterns may have a variable, types separated by `|` and properties, and
+are directed with `->` or `<-` or undirected. Property values are strings,
+numbers, `true`, `false` or `null`, and booleans do not match numbers. A
+variable used more than once must be bound to the same item, so it cannot
+name both a node and a relationship.
+"""
+from __future__ import unicode_literals, absolute_import
+
+import re
+from collections import defaultdict
+from .graph import Node, PropIndex, OUTGOING, INCOMING, _component_of
+
+# Alias str to unicode with unicode_literals imported
+try:
+    str = unicode
+except NameError:
+    pass
+
+
+TOKENS = re.compile(r'''\s*(?:
+    (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")|
+    (?P<number>\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)|
+    (?P<name>[A-Za-z_][A-Za-z0-9_]*|`[^`]+`)|
+    (?P<symbol>[-()\[\]{}:,|<>])
+)''', re.X)
+
+CONSTANTS = {'true': True, 'false': False, 'null': None}
+
+# Kinds of the variable of a pattern element in the order of matching.
+UNBOUND = 0
+BIND = 1
+CHECK = 2
+
+
+class NodePattern(object):
+    def __init__(self, var=None, labels=(), props=None):
+        self.var = var
+        self.labels = tuple(labels)
+        self.props = props or None
+
+    def __repr__(self):
+        return 'NodePattern({!r}, {!r}, {!r})'.format(self.var, self.labels,
+                                                      self.props)
+
+
+class RelPattern(object):
+    def __init__(self, var=None, types=None, props=None, direction=None):
+        self.var = var
+        self.types = tuple(types) if types else None
+        self.props = props or None
+        self.direction = direction
+
+    def __repr__(self):
+        return 'RelPattern({!r}, {!r}, {!r}, {!r})'.format(
+            self.var, self.types, self.props, self.direction)
+
+
+class Pattern(object):
+    "Path of node patterns where `rels[i]` joins `nodes[i]` and `nodes[i+1]`."
+    def __init__(self, nodes, rels=()):
+        if len(nodes) != len(rels) + 1:
+            raise ValueError('a pattern has one more node than rels')
+
+        self.nodes = list(nodes)
+        self.rels = list(rels)
+
+        node_vars = {node.var for node in self.nodes}
+
+        for rel in self.rels:
+            if rel.var is not None and rel.var in node_vars:
+                raise ValueError('variable {!r} is used for both a node and '
+                                 'a relationship'.format(rel.var))
+
+
+def _unquote(value):
+    return re.sub(r'\\(.)', r'\1', value[1:-1])
+
+
+class _Parser(object):
+    def __init__(self, text):
+        self.text = text
+        self.tokens = []
+        self.pos = 0
+
+        end = len(text.rstrip())
+        offset = 0
+
+        while offset < end:
+            match = TOKENS.match(text, offset)
+
+            if match is None:
+                offset = len(text) - len(text[offset:].lstrip())
+                self.error('unexpected character', offset)
+
+            kind = match.lastgroup
+            self.tokens.append((kind, match.group(kind), match.start(kind)))
+            offset = match.end()
+
+    def error(self, message, offset=None):
+        if offset is None:
+            if self.pos < len(self.tokens):
+                offset = self.tokens[self.pos][2]
+            else:
+                offset = len(self.text)
+
+        raise ValueError('{} at {} in pattern {!r}'.format(
+            message, offset, self.text))
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos][:2]
+        return None, None
+
+    def accept(self, symbol):
+        if self.peek() == ('symbol', symbol):
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, symbol):
+        if not self.accept(symbol):
+            self.error('expected {!r}'.format(symbol))
+
+    def name(self):
+        kind, value = self.peek()
+
+        if kind != 'name':
+            self.error('expected a name')
+
+        self.pos += 1
+        return value.strip('`')
+
+    def var(self):
+        if self.peek()[0] == 'name':
+            return self.name()
+
+    def pattern(self):
+        nodes = [self.node()]
+        rels = []
+
+        while self.pos < len(self.tokens):
+            rels.append(self.rel())
+            nodes.append(self.node())
+
+        return Pattern(nodes, rels)
+
+    def node(self):
+        self.expect('(')
+        var = self.var()
+        labels = []
+
+        while self.accept(':'):
+            labels.append(self.name())
+
+        props = self.props()
+        self.expect(')')
+        return NodePattern(var, labels, props)
+
+    def rel(self):
+        incoming = self.accept('<')
+        self.expect('-')
+
+        var = None
+        types = []
+        props = None
+
+        if self.accept('['):
+            var = self.var()
+
+            if self.accept(':'):
+                types.append(self.name())
+
+                while self.accept('|'):
+                    self.accept(':')
+                    types.append(self.name())
+
+            props = self.props()
+            self.expect(']')
+
+        self.expect('-')
+        outgoing = self.accept('>')
+
+        if incoming and outgoing:
+            self.error('relationship has both directions')
+
+        if outgoing:
+            direction = OUTGOING
+        elif incoming:
+            direction = INCOMING
+        else:
+            direction = None
+
+        return RelPattern(var, types, props, direction)
+
+    def props(self):
+        if not self.accept('{'):
+            return None
+
+        props = {}
+
+        if self.accept('}'):
+            return props
+
+        while True:
+            kind, value = self.peek()
+
+            if kind == 'string':
+                self.pos += 1
+                key = _unquote(value)
+            else:
+                key = self.name()
+
+            self.expect(':')
+            props[key] = self.value()
+
+            if self.accept('}'):
+                return props
+
+            self.expect(',')
+
+    def value(self):
+        sign = -1 if self.accept('-') else 1
+        kind, value = self.peek()
+        self.pos += 1
+
+        if kind == 'number':
+            if re.match(r'^\d+$', value):
+                return sign * int(value)
+            return sign * float(value)
+
+        if sign == 1:
+            if kind == 'string':
+                return _unquote(value)
+
+            if kind == 'name' and value.lower() in CONSTANTS:
+                return CONSTANTS[value.lower()]
+
+        self.pos -= 1
+        self.error('expected a value')
+
+
+def parse(text):
+    "Parses a pattern. Raises ValueError if it is invalid."
+    if isinstance(text, Pattern):
+        return text
+
+    return _Parser(str(text)).pattern()
+
+
+def _equal(value, expected):
+    "Compares property values, where booleans are not equal to numbers."
+    return value == expected and \
+        isinstance(value, bool) == isinstance(expected, bool)
+
+
+def _props_match(props, expected):
+    for key, value in expected.items():
+        if key not in props or not _equal(props[key], value):
+            return False
+    return True
+
+
+def _node_matches(node, pattern):
+    if pattern.labels:
+        labels = node.labels or ()
+
+        for label in pattern.labels:
+            if label not in labels:
+                return False
+
+    return not pattern.props or _props_match(node.props, pattern.props)
+
+
+def _adjacent(node, types, direction):
+    """Iterates over (rel, node) pairs of the rels of a node with the types
+    in the direction. Undirected self-loops are output once.
+    """
+    outgoing = node._outgoing
+    incoming = node._incoming
+
+    if types is None:
+        if direction != INCOMING:
+            for other, rels in outgoing.items():
+                for rel in rels.values():
+                    yield rel, other
+
+        if direction != OUTGOING:
+            for other, rels in incoming.items():
+                if other is node and direction is None:
+                    continue
+
+                for rel in rels.values():
+                    yield rel, other
+        return
+
+    for type in types:
+        # Nodes related by the type in either direction.
+        others = node._types.get(type)
+
+        if not others:
+            continue
+
+        for other in others:
+            if direction != INCOMING:
+                rel = outgoing.get(other, {}).get(type)
+
+                if rel is not None:
+                    yield rel, other
+
+            if direction != OUTGOING:
+                if other is node and direction is None:
+                    continue
+
+                rel = incoming.get(other, {}).get(type)
+
+                if rel is not None:
+                    yield rel, other
+
+
+def _var_kinds(elements):
+    "Returns the kind of the variable of each element in matching order."
+    seen = set()
+    kinds = []
+
+    for element in elements:
+        if element.var is None:
+            kinds.append(UNBOUND)
+        elif element.var in seen:
+            kinds.append(CHECK)
+        else:
+            seen.add(element.var)
+            kinds.append(BIND)
+
+    return kinds
+
+
+class Matcher(object):
+    """Matches patterns against the graphs connected to one or more nodes.
+
+    Matching starts from the node pattern with the fewest candidates, found
+    in an index of labels or of a property, and expands through the rels of
+    the matched nodes by type. Indexes are built on first use and reflect
+    the graph at that time, so a new matcher should be created after
+    nodes are added or their labels or properties change.
+    """
+    def __init__(self, items):
+        if isinstance(items, Node):
+            items = [items]
+
+        self.nodes = _component_of(items)[0]
+        self._labels = None
+        self._indexes = {}
+
+    def _label_index(self):
+        if self._labels is None:
+            self._labels = defaultdict(list)
+
+            for node in self.nodes:
+                for label in node.labels or ():
+                    self._labels[label].append(node)
+
+        return self._labels
+
+    def _prop_index(self, key):
+        if key not in self._indexes:
+            self._indexes[key] = PropIndex(self.nodes, key)
+
+        return self._indexes[key]
+
+    def _candidates(self, pattern):
+        "Returns the source and key of the smallest candidate list."
+        best = ('scan', None, self.nodes)
+
+        for key, value in (pattern.props or {}).items():
+            positions = self._prop_index(key).lookup(value)
+
+            # True and 1 are equal and hash alike in the index.
+            if value in (True, False):
+                positions = [i for i in positions
+                             if _equal(self.nodes[i].props.get(key), value)]
+
+            if len(positions) < len(best[2]):
+                best = ('index', key, positions)
+
+        for label in pattern.labels:
+            nodes = self._label_index().get(label, ())
+
+            if len(nodes) < len(best[2]):
+                best = ('label', label, nodes)
+
+        source, key, candidates = best
+
+        if source == 'index':
+            candidates = [self.nodes[i] for i in candidates]
+
+        return source, key, candidates
+
+    def _plan(self, pattern):
+        anchor = None
+
+        for i, node in enumerate(pattern.nodes):
+            source, key, candidates = self._candidates(node)
+
+            if anchor is None or len(candidates) < len(anchor[3]):
+                anchor = (i, source, key, candidates)
+
+        i = anchor[0]
+
+        # Expands to the end of the path and then back to its start.
+        steps = [(pattern.rels[j], j, j + 1, pattern.rels[j].direction)
+                 for j in range(i, len(pattern.rels))]
+
+        for j in range(i - 1, -1, -1):
+            direction = pattern.rels[j].direction
+            steps.append((pattern.rels[j], j + 1, j,
+                          -direction if direction else None))
+
+        return anchor, steps
+
+    def plan(self, pattern):
+        """Returns how a pattern would be matched: the position of the node
+        pattern matching starts from, the `source` of its candidates, one
+        of `index`, `label` or `scan`, the property key or label, the number
+        of candidates and the order the rel patterns are expanded in.
+        """
+        pattern = parse(pattern)
+        anchor, steps = self._plan(pattern)
+
+        return {
+            'anchor': anchor[0],
+            'source': anchor[1],
+            'key': anchor[2],
+            'candidates': len(anchor[3]),
+            'order': [min(source, target) for _, source, target, _ in steps],
+        }
+
+    def match(self, pattern):
+        """Yields a dict of the nodes and rels bound to the variables of the
+        pattern for each match.
+        """
+        pattern = parse(pattern)
+        (anchor, _, _, candidates), steps = self._plan(pattern)
+
+        node_pattern = pattern.nodes[anchor]
+        elements = [node_pattern]
+
+        for rel_pattern, _, target, _ in steps:
+            elements.append(rel_pattern)
+            elements.append(pattern.nodes[target])
+
+        kinds = _var_kinds(elements)
+        slots = [None] * len(pattern.nodes)
+        bound = {}
+        var = node_pattern.var
+
+        for node in candidates:
+            if not _node_matches(node, node_pattern):
+                continue
+
+            slots[anchor] = node
+
+            if var is not None:
+                bound[var] = node
+
+            for binding in self._search(steps, 0, pattern, kinds, slots,
+                                        bound, []):
+                yield binding
+
+    def _search(self, steps, depth, pattern, kinds, slots, bound, used):
+        if depth == len(steps):
+            yield dict(bound)
+            return
+
+        rel_pattern, source, target, direction = steps[depth]
+        node_pattern = pattern.nodes[target]
+        rel_kind = kinds[depth * 2 + 1]
+        node_kind = kinds[depth * 2 + 2]
+
+        for rel, other in _adjacent(slots[source], rel_pattern.types,
+                                    direction):
+            # A rel is matched at most once per path.
+            if any(r is rel for r in used):
+                continue
+
+            if rel_pattern.props and \
+                    not _props_match(rel.props, rel_pattern.props):
+                continue
+
+            if rel_kind == CHECK and bound[rel_pattern.var] is not rel:
+                continue
+
+            if node_kind == CHECK and bound[node_pattern.var] is not other:
+                continue
+
+            if not _node_matches(other, node_pattern):
+                continue
+
+            if rel_kind == BIND:
+                bound[rel_pattern.var] = rel
+
+            if node_kind == BIND:
+                bound[node_pattern.var] = other
+
+            slots[target] = other
+            used.append(rel)
+
+            for binding in self._search(steps, depth + 1, pattern, kinds,
+                                        slots, bound, used):
+                yield binding
+
+            used.pop()
+
+
+def match(pattern, items):
+    """Yields the matches of a pattern in the graphs connected to one or
+    more nodes. See `Matcher` to match several patterns against a graph.
+    """
+    return Matcher(items).match(pattern)
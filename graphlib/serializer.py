@@ -1,6 +1,10 @@
 from __future__ import unicode_literals, absolute_import
+from array import array
 from collections import deque
-from .graph import Node, Rel
+from timeit import default_timer
+from .graph import Node, Rel, ChangeTracker, _make_node, _make_rel, \
+    _gc_paused
+from .codec import dumps, loads
 
 # Alias str to unicode with unicode_literals imported
 try:
@@ -9,35 +13,101 @@ except NameError:
     pass
 
 
+def node_data(node):
+    "Returns the serialized data for a node."
+    data = {'props': node.serialize()}
+
+    if node.labels:
+        data['labels'] = list(node.labels)
+
+    if node.match_props is not None:
+        data['match'] = node.match_props
+
+    if node.update_props is not None:
+        data['update'] = node.update_props
+
+    return data
+
+
+def rel_data(rel, start, end):
+    "Returns the serialized data for a rel given the indexes of its nodes."
+    data = {
+        'start': start,
+        'end': end,
+        'type': rel.type,
+        'props': rel.serialize()
+    }
+
+    if rel.match_props is not None:
+        data['match'] = rel.match_props
+
+    if rel.update_props is not None:
+        data['update'] = rel.update_props
+
+    return data
+
+
 class Serializer(object):
     """Serializer to a data structure compatible with the JSON Graph
     Specification. Serialization is incremental and after each call the
     current output is returned from `serialize`.
 
     See https://github.com/bruth/json-graph-spec for more information.
+
+    If `grouped` is true, the items output by each call are reordered so
+    that nodes come first grouped by labels and match keys, followed by
+    rels grouped by type and match keys. Every rel still appears after its
+    nodes, and each batch contains items of a single group.
+
+    If `track` is true, mutations of the output items are recorded so
+    `serialize_changes` can output only what changed since the last call.
+    An item can be tracked by one serializer at a time, until `close` is
+    called on it. Removed rels leave `None` in `items` and `batches` until
+    `compact` is called, and `holes` is the number left.
+
+    If a `graphlib.stats.Stats` instance is passed as `stats`, the time
+    spent and the nodes and rels output by each call are recorded.
     """
-    def __init__(self):
+    def __init__(self, grouped=False, track=False, stats=None):
+        # Queue of (item, depth) pairs with a set of the queued items
+        # for constant time membership checks.
         self.queue = deque()
+        self.queued = set()
         self.indexes = {}
         self.items = []
         self.batches = []
         self.index = 0
+        self.grouped = grouped
+        self.tracker = ChangeTracker() if track else None
+        self.stats = stats
 
-        # 1 - node, 2 - rel
+        # 1 - node, 2 - rel, or the group key in grouped mode
         self._batch = None
         self._batch_type = None
 
-    def _queue(self, item):
-        if item not in self.indexes and item not in self.queue:
+        # Items pending output in grouped mode by group key.
+        self._groups = {}
+        self._group_keys = []
+
+        # Batch and position in it of each tracked item, and the number of
+        # removed items left in the output.
+        self._locations = {}
+        self.holes = 0
+
+    def _queue(self, item, depth=0):
+        if item not in self.indexes and item not in self.queued:
             if isinstance(item, Node):
-                self.queue.append(item)
+                self.queued.add(item)
+                self.queue.append((item, depth))
             elif isinstance(item, Rel):
-                self._queue(item.start)
-                self._queue(item.end)
-                self.queue.append(item)
+                self._queue(item.start, depth)
+                self._queue(item.end, depth)
+                self.queued.add(item)
+                self.queue.append((item, depth))
 
-    def _batch_item(self, item, data):
-        item_type = 'type' in data and 2 or 1
+    def _batch_item(self, item, data, item_type=None):
+        if item_type is None:
+            item_type = 'type' in data and 2 or 1
 
         # Append and reset the batch
         if item_type != self._batch_type:
@@ -48,68 +118,100 @@ class Serializer(object):
 
         self._batch.append(data)
 
-    def _add_item(self, item, data):
+    def _add_item(self, item, data, group=None):
+        # Tracked first so an item tracked by another serializer is not
+        # output.
+        if self.tracker is not None:
+            self.tracker.track(item)
+
         self.items.append(data)
         self.indexes[item] = self.index
         self.index += 1
-        self._batch_item(item, data)
-
-    def _add_node(self, node):
-        data = {'props': node.serialize()}
+        self._batch_item(item, data, group)
 
-        if node.labels:
-            data['labels'] = list(node.labels)
+        if self.tracker is not None:
+            self._locations[item] = (self._batch, len(self._batch) - 1)
 
-        if node.match_props is not None:
-            data['match'] = node.match_props
-
-        if node.update_props is not None:
-            data['update'] = node.update_props
-
-        self._add_item(node, data)
+    def _add_node(self, node):
+        if self.grouped:
+            self._group(node, (1, _hashable(node.labels),
+                               _hashable(node.match_props),
+                               _hashable(node.update_props)))
+        else:
+            self._add_item(node, node_data(node))
 
     def _add_rel(self, rel):
-        data = {
-            'start': self.indexes[rel.start],
-            'end': self.indexes[rel.end],
-            'type': rel.type,
-            'props': rel.serialize()
-        }
-
-        if rel.match_props is not None:
-            data['match'] = rel.match_props
-
-        if rel.update_props is not None:
-            data['update'] = rel.update_props
-
-        self._add_item(rel, data)
+        if self.grouped:
+            self._group(rel, (2, rel.type, _hashable(rel.match_props),
+                              _hashable(rel.update_props)))
+        else:
+            data = rel_data(rel, self.indexes[rel.start],
+                            self.indexes[rel.end])
+            self._add_item(rel, data)
+
+    def _group(self, item, key):
+        if key not in self._groups:
+            self._groups[key] = []
+            self._group_keys.append(key)
+        self._groups[key].append(item)
+
+    def _flush_groups(self):
+        "Outputs the pending items, nodes first, in group order."
+        # Stable sort keeps the groups in the order they were first seen.
+        keys = sorted(self._group_keys, key=lambda k: k[0])
+
+        for key in keys:
+            for item in self._groups[key]:
+                if key[0] == 1:
+                    data = node_data(item)
+                else:
+                    data = rel_data(item, self.indexes[item.start],
+                                    self.indexes[item.end])
+                self._add_item(item, data, key)
+
+        self._groups = {}
+        self._group_keys = []
+        self.queued.clear()
 
     def _serialize_rel(self, rel):
         self._add_rel(rel)
 
-    def _serialize_node(self, node, traverse):
+    def _serialize_node(self, node, depth, traverse, max_depth, types,
+                        direction):
         # Add the node to the items
         self._add_node(node)
 
-        if traverse:
-            # Queue neighbors for traversal
-            for node in node.neighbors:
-                self._queue(node)
+        if not traverse:
+            return
 
-            # Queue relationships to neighbors. The start and end
-            # nodes are guaranteed to be queued first, so there is
-            # not need to queue them here.
-            for rel in node.rels():
-                self._queue(rel)
+        if max_depth is not None and depth >= max_depth:
+            return
 
-    def _serialize(self, item, traverse):
+        adjacent = list(node._expand(types, direction))
+
+        # Queue neighbors for traversal
+        for rel, other in adjacent:
+            self._queue(other, depth + 1)
+
+        # Queue relationships to neighbors. The start and end
+        # nodes are guaranteed to be queued first, so there is
+        # not need to queue them here.
+        for rel, other in adjacent:
+            self._queue(rel, depth + 1)
+
+    def _serialize(self, item, depth, *args):
         if isinstance(item, Node):
-            self._serialize_node(item, traverse)
+            self._serialize_node(item, depth, *args)
         else:
             self._serialize_rel(item)
 
-    def serialize(self, item, traverse=True):
-        "Prepares a node or relationship for export."
+    def serialize(self, item, traverse=True, max_depth=None, types=None,
+                  direction=None):
+        """Prepares a node or relationship for export. By default the
+        items connected to it are traversed and exported as well. The
+        traversal can be limited to a depth from the item, a set of
+        rel types and a direction.
+        """
         if isinstance(item, (Node, Rel)):
             self._queue(item)
         elif isinstance(item, (tuple, list)):
@@ -119,64 +221,368 @@ class Serializer(object):
             raise TypeError('unable to prepare objects with type "{}"'
                             .format(type(item)))
 
+        if isinstance(types, (str, bytes)):
+            types = (types,)
+
+        if self.stats is not None:
+            start = default_timer()
+            index = self.index
+
         while self.queue:
-            item = self.queue.popleft()
-            self._serialize(item, traverse)
+            item, depth = self.queue.popleft()
+
+            # Pending items in grouped mode remain in the queued set
+            # until they are output.
+            if not self.grouped:
+                self.queued.discard(item)
+
+            self._serialize(item, depth, traverse, max_depth, types,
+                            direction)
+
+        if self.grouped:
+            self._flush_groups()
+
+        if self.stats is not None:
+            self._record(start, index)
 
         return self.items
 
+    def _record(self, start, index):
+        seconds = default_timer() - start
+        items = self.items[index:]
+        rels = sum(1 for data in items if 'type' in data)
+
+        self.stats.add_time('serialize', seconds)
+        self.stats.incr('nodes', len(items) - rels)
+        self.stats.incr('rels', rels)
+        self.stats.add_batch('serialize', len(items), seconds)
+
+    def serialize_changes(self):
+        """Outputs the changes to the serialized items since the previous
+        call or the initial serialization. Returns a dict of `added`,
+        `changed` and `removed` item data.
+
+        Removed rels are no longer tracked, so they can be re-added. Their
+        data is replaced by `None` in `items` and `batches`, so the work
+        done is proportional to the changes and the positions of the other
+        items do not change. `compact` drops the holes.
+
+        Added rels are traversed so new nodes reachable through them are
+        added as well. Changed items are updated in place in `items`.
+        Changes to labels and match or update keys are only output if
+        recorded with `tracker.record_change`.
+        """
+        if self.tracker is None:
+            raise ValueError('change tracking is not enabled')
+
+        added, changed, removed = self.tracker.checkpoint()
+
+        removed_data = []
+
+        for rel in removed:
+            index = self.indexes.pop(rel, None)
+
+            if index is not None:
+                self.tracker.untrack(rel)
+                removed_data.append(self.items[index])
+                self.items[index] = None
+
+                batch, position = self._locations.pop(rel)
+                batch[position] = None
+                self.holes += 1
+
+        # Rels that were added and then removed again.
+        added = [rel for rel in added
+                 if rel.start._outgoing.get(rel.end, {}).get(rel.type) is rel]
+
+        start = self.index
+        changed_data = []
+
+        for item in changed:
+            index = self.indexes.get(item)
+
+            if index is None:
+                continue
+
+            if isinstance(item, Node):
+                data = node_data(item)
+            else:
+                data = rel_data(item, self.indexes[item.start],
+                                self.indexes[item.end])
+
+            # Updated in place since the batches reference the same dict.
+            self.items[index].clear()
+            self.items[index].update(data)
+            changed_data.append((index, self.items[index]))
+
+        self.serialize(added)
+
+        changed_data.sort(key=lambda x: x[0])
+
+        return {
+            'added': self.items[start:],
+            'changed': [data for _, data in changed_data],
+            'removed': removed_data,
+        }
+
+    def compact(self):
+        """Drops the holes left by removed rels from `items` and `batches`
+        and updates the positions of the remaining items. Takes time
+        proportional to the whole output.
+        """
+        if not self.holes:
+            return
+
+        # New position of each item or -1 if removed.
+        positions = array('l')
+        items = []
+
+        for data in self.items:
+            if data is None:
+                positions.append(-1)
+            else:
+                positions.append(len(items))
+                items.append(data)
+
+        for data in items:
+            if 'type' in data:
+                data['start'] = positions[data['start']]
+                data['end'] = positions[data['end']]
+
+        for item, index in self.indexes.items():
+            self.indexes[item] = positions[index]
+
+        locations = {}
+
+        for batch in self.batches:
+            if None in batch:
+                batch[:] = [data for data in batch if data is not None]
+
+            for position, data in enumerate(batch):
+                locations[id(data)] = (batch, position)
+
+        self.batches = [batch for batch in self.batches if batch]
+
+        # The next items start a new batch if the last one was emptied.
+        if not self._batch:
+            self._batch = None
+            self._batch_type = None
+
+        if self.tracker is not None:
+            self._locations = {item: locations[id(items[index])]
+                               for item, index in self.indexes.items()}
+
+        self.items = items
+        self.index = len(items)
+        self.holes = 0
+
+    def close(self):
+        """Stops tracking changes so the items can be tracked by another
+        serializer.
+        """
+        if self.tracker is not None:
+            self.tracker.close()
+
+
+def _hashable(value):
+    "Returns a hashable version of a labels or match/update keys value."
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
 
 def serialize(*args, **kwargs):
     "Convenience method one-off serialization."
-    serializer = Serializer()
+    serializer = Serializer(grouped=kwargs.pop('grouped', False),
+                            stats=kwargs.pop('stats', None))
     return serializer.serialize(*args, **kwargs)
 
 
-def convert_array_to_dict(items):
-    "Convert an array-based format to a dict."
-    data = {
-        'nodes': [],
-        'rels': [],
-    }
+def serialize_json(*args, **kwargs):
+    """Serializes like `serialize` and encodes the output as JSON with the
+    backend selected in `graphlib.codec`.
+    """
+    return dumps(serialize(*args, **kwargs))
 
-    nmap = {}
-    nindex = 0
 
-    for index, item in enumerate(items):
+def _deserialize_node(data, nodeclass):
+    node = nodeclass(dict(data.get('props') or {}), labels=data.get('labels'))
+
+    if data.get('match') is not None:
+        node.match_props = data['match']
+    if data.get('update') is not None:
+        node.update_props = data['update']
+
+    return node
+
+
+def _deserialize_rel(data, start, end, relclass):
+    rel = start.relate(end, data['type'], dict(data.get('props') or {}),
+                       relclass=relclass)
+
+    if data.get('match') is not None:
+        rel.match_props = data['match']
+    if data.get('update') is not None:
+        rel.update_props = data['update']
+
+    return rel
+
+
+def _bulk_node(data, nodeclass):
+    get = data.get
+    props = get('props')
+
+    return _make_node(nodeclass, dict(props) if props else {},
+                      get('labels'), get('match'), get('update'))
+
+
+def _bulk_rel(data, start, end, relclass):
+    get = data.get
+    props = get('props')
+
+    return _make_rel(relclass, start, end, data['type'],
+                     dict(props) if props else {}, get('match'),
+                     get('update'))
+
+
+def deserialize(data, nodeclass=Node, relclass=Rel, bulk=True):
+    """Rebuilds nodes and relationships from data in the array or dict
+    format of the JSON Graph Spec. The objects are returned in the same
+    layout as the data, a list for the array format and a dict with `nodes`
+    and `rels` lists for the dict format.
+
+    By default objects are constructed in bulk which bypasses `__init__`
+    and the validation in `Node.relate` and fills the relationship dicts
+    directly. Set `bulk` to false to construct them through the public API.
+    """
+    if not bulk:
+        return _deserialize(data, nodeclass, relclass, _deserialize_node,
+                            _deserialize_rel)
+
+    with _gc_paused():
+        return _deserialize(data, nodeclass, relclass, _bulk_node,
+                            _bulk_rel)
+
+
+def deserialize_json(data, **kwargs):
+    """Decodes JSON with the backend selected in `graphlib.codec` and
+    deserializes it like `deserialize`.
+    """
+    return deserialize(loads(data), **kwargs)
+
+
+def _deserialize(data, nodeclass, relclass, make_node, make_rel):
+    if isinstance(data, dict):
+        nodes = [make_node(n, nodeclass) for n in data.get('nodes', ())]
+        rels = [make_rel(r, nodes[int(r['start'])], nodes[int(r['end'])],
+                         relclass)
+                for r in data.get('rels', ())]
+
+        return {'nodes': nodes, 'rels': rels}
+
+    if not isinstance(data, (list, tuple)):
+        raise ValueError('Invalid format. Must be a dict or list/tuple')
+
+    items = []
+    append = items.append
+
+    for item in data:
         if 'type' in item:
-            data['rels'].append(item)
+            append(make_rel(item, items[int(item['start'])],
+                            items[int(item['end'])], relclass))
         else:
-            data['nodes'].append(item)
-            nmap[index] = nindex
-            nindex += 1
+            append(make_node(item, nodeclass))
 
-    # Map index from flat array to local node array
-    for rel in data['rels']:
-        rel['start'] = nmap[rel['start']]
-        rel['end'] = nmap[rel['end']]
+    return items
 
-    return data
 
+def iter_array_to_dict(items):
+    """Converts the array format to the dict format as a stream of
+    (`'nodes'`, data) and (`'rels'`, data) pairs in the order of the items.
+    Rels are copied with their start and end mapped to positions in the
+    nodes, and the input is not modified.
 
-def convert_dict_to_array(data):
-    "Convert a dict-based format to an array."
-    items = []
+    Items are read once, so `items` may be a generator. The only state kept
+    is a table of the node position of each item.
+    """
+    # Node position of each item or -1 for rels.
+    positions = array('l')
+    append = positions.append
+    count = 0
+
+    for index, item in enumerate(items):
+        if 'type' not in item:
+            append(count)
+            count += 1
+            yield 'nodes', item
+            continue
+
+        append(-1)
+        start = int(item['start'])
+        end = int(item['end'])
+
+        # Rels may only refer to nodes before them.
+        if 0 <= start < index and 0 <= end < index:
+            start = positions[start]
+            end = positions[end]
+        else:
+            start = end = -1
+
+        if start < 0 or end < 0:
+            raise ValueError('rel {} refers to an item which is not a node'
+                             .format(index))
 
-    nmap = {}
-    index = 0
+        rel = dict(item)
+        rel['start'] = start
+        rel['end'] = end
 
+        yield 'rels', rel
+
+
+def iter_dict_to_array(data):
+    """Converts the dict format to the array format as a stream of items.
+    Nodes are output first, so rel start and end are the same in both
+    formats and the items are output as is.
+    """
     nodes = data.get('nodes', ())
-    rels = data.get('rels', ())
+    count = len(nodes)
+
+    for node in nodes:
+        yield node
 
-    for nindex, node in enumerate(nodes):
-        items.append(node)
-        nmap[nindex] = index
-        index += 1
+    for index, rel in enumerate(data.get('rels', ())):
+        for key in ('start', 'end'):
+            if not 0 <= int(rel[key]) < count:
+                raise ValueError('rel {} refers to {} which is not a node'
+                                 .format(index, rel[key]))
 
-    # Map index from local node array to flat index
-    for rel in enumerate(rels):
-        items.append(rel)
-        rel['start'] = nmap[rel['start']]
-        rel['end'] = nmap[rel['end']]
+        yield rel
+
+
+def split(data):
+    """Returns lists of the nodes and rels of data in either format where
+    rel start and end refer to positions in the nodes.
+    """
+    if isinstance(data, dict):
+        return list(data.get('nodes', ())), list(data.get('rels', ()))
+
+    converted = convert_array_to_dict(data)
+    return converted['nodes'], converted['rels']
+
+
+def convert_array_to_dict(items):
+    "Convert an array-based format to a dict."
+    data = {
+        'nodes': [],
+        'rels': [],
+    }
+
+    for key, item in iter_array_to_dict(items):
+        data[key].append(item)
 
     return data
+
+
+def convert_dict_to_array(data):
+    "Convert a dict-based format to an array."
+    return list(iter_dict_to_array(data))
@@ -0,0 +1,455 @@
+from __future__ import unicode_literals, absolute_import
+
+import json
+import sqlite3
+import weakref
+from collections import OrderedDict, defaultdict
+from .graph import Node, Rel, TYPES, ADJACENCY, intern_labels
+
+# Alias str to unicode with unicode_literals imported
+try:
+    str = unicode
+except NameError:
+    pass
+
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS nodes ('
+    ' id INTEGER PRIMARY KEY,'
+    ' labels TEXT,'
+    ' props TEXT NOT NULL,'
+    ' match_props TEXT,'
+    ' update_props TEXT)',
+
+    'CREATE TABLE IF NOT EXISTS rels ('
+    ' id INTEGER PRIMARY KEY,'
+    ' start_id INTEGER NOT NULL REFERENCES nodes (id),'
+    ' end_id INTEGER NOT NULL REFERENCES nodes (id),'
+    ' type TEXT NOT NULL,'
+    ' props TEXT NOT NULL,'
+    ' match_props TEXT,'
+    ' update_props TEXT,'
+    ' UNIQUE (start_id, end_id, type))',
+
+    'CREATE INDEX IF NOT EXISTS rels_end ON rels (end_id)',
+)
+
+NODE_COLUMNS = 'id, labels, props, match_props, update_props'
+REL_COLUMNS = 'id, start_id, end_id, type, props, match_props, update_props'
+
+
+def _dumps(value):
+    if value is None:
+        return None
+    return json.dumps(value)
+
+
+def _loads(value):
+    if value is None:
+        return None
+    return json.loads(value)
+
+
+class StoredItem(object):
+    """Mixin for items persisted in a `Store`. Property changes made through
+    the item API are written through to the store.
+    """
+    id = None
+    _store = None
+
+    def __setitem__(self, key, value):
+        super(StoredItem, self).__setitem__(key, value)
+        self.save()
+
+    def __delitem__(self, key):
+        super(StoredItem, self).__delitem__(key)
+        self.save()
+
+    def update(self, props):
+        super(StoredItem, self).update(props)
+        self.save()
+
+    def save(self):
+        """Writes the item to the store. Needed after changing `props`,
+        `labels`, `match_props` or `update_props` directly.
+        """
+        if self._store is not None:
+            self._store._save(self)
+
+
+class StoredRel(StoredItem, Rel):
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__, self.id)
+
+
+def _adjacency(name):
+    """Returns a property for a relationship dict of a stored node which
+    loads the relationships if needed and marks the node as used.
+    """
+    def get(self):
+        store = self._store
+
+        if store is not None:
+            if name in self.__dict__:
+                store._touch(self)
+            else:
+                store._load(self)
+
+        try:
+            return self.__dict__[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def set(self, value):
+        self.__dict__[name] = value
+
+    return property(get, set)
+
+
+class StoredNode(StoredItem, Node):
+    """Node persisted in a `Store`. Its relationships are loaded from the
+    store on first access and dropped again when the node is evicted from
+    the cache. Nodes are created with `Store.create`.
+    """
+    relclass = StoredRel
+
+    _outgoing = _adjacency('_outgoing')
+    _incoming = _adjacency('_incoming')
+    _types = _adjacency('_types')
+
+    def __init__(self, *args, **kwargs):
+        raise TypeError('stored nodes must be created with Store.create')
+
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__, self.id)
+
+    def _add_rel(self, rel):
+        self._store._add_rel(rel)
+
+    def _remove_rel(self, rel):
+        self._store._remove_rel(rel)
+
+
+def _loaded(node):
+    return '_outgoing' in node.__dict__
+
+
+class Store(object):
+    """Graph stored in a SQLite database. Nodes and rels are read on demand
+    and support the same API as in-memory ones. Identity is preserved, so a
+    node or rel is represented by at most one object at a time.
+
+    The relationships of the `cache_size` most recently used nodes are kept
+    in memory. Changes are written through to the database and committed
+    with `commit` or when used as a context manager.
+    """
+    def __init__(self, path=':memory:', cache_size=10000,
+                 nodeclass=StoredNode):
+        self.path = path
+        self.cache_size = cache_size
+        self.nodeclass = nodeclass
+        self.conn = sqlite3.connect(path)
+
+        for stmt in SCHEMA:
+            self.conn.execute(stmt)
+
+        self._nodes = weakref.WeakValueDictionary()
+        self._rels = weakref.WeakValueDictionary()
+
+        # Least recently used nodes with their relationships loaded.
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return self.conn.execute('SELECT count(*) FROM nodes').fetchone()[0]
+
+    def __iter__(self):
+        return self.nodes()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+        # Cached objects may reflect the discarded changes.
+        self.clear()
+
+    def close(self):
+        self.conn.close()
+
+    def clear(self):
+        "Drops the loaded relationships of all nodes."
+        for node in list(self._nodes.values()):
+            for name in ADJACENCY:
+                node.__dict__.pop(name, None)
+
+        self._cache.clear()
+
+    def _touch(self, node):
+        cache = self._cache
+
+        if node.id in cache:
+            # Reinserted to move it to the end.
+            del cache[node.id]
+            cache[node.id] = node
+            return
+
+        cache[node.id] = node
+
+        while len(cache) > self.cache_size:
+            _, old = cache.popitem(last=False)
+
+            for name in ADJACENCY:
+                old.__dict__.pop(name, None)
+
+    def _node(self, row):
+        id, labels, props, match_props, update_props = row
+        node = self._nodes.get(id)
+
+        if node is not None:
+            return node
+
+        return self._make_node(id, json.loads(props), _loads(labels),
+                               _loads(match_props), _loads(update_props))
+
+    def _make_node(self, id, props, labels, match_props, update_props):
+        node = self.nodeclass.__new__(self.nodeclass)
+        node.__dict__ = {'id': id, 'props': props, '_store': self}
+
+        if labels:
+            node.labels = intern_labels(labels)
+        if match_props is not None:
+            node.match_props = match_props
+        if update_props is not None:
+            node.update_props = update_props
+
+        self._nodes[id] = node
+        return node
+
+    def _rel(self, row):
+        id, start_id, end_id, type, props, match_props, update_props = row
+        rel = self._rels.get(id)
+
+        if rel is not None:
+            return rel
+
+        relclass = self.nodeclass.relclass
+        rel = relclass.__new__(relclass)
+        rel.__dict__ = {
+            'id': id,
+            'start': self.get(start_id),
+            'end': self.get(end_id),
+            'type': TYPES.intern(type),
+            'props': json.loads(props),
+            '_store': self,
+        }
+
+        if match_props is not None:
+            rel.match_props = json.loads(match_props)
+        if update_props is not None:
+            rel.update_props = json.loads(update_props)
+
+        self._rels[id] = rel
+        return rel
+
+    def _load(self, node):
+        "Loads the relationships of a node."
+        self._touch(node)
+
+        outgoing = defaultdict(dict)
+        incoming = defaultdict(dict)
+        types = defaultdict(set)
+
+        rows = self.conn.execute('SELECT {} FROM rels WHERE start_id = ?'
+                                 .format(REL_COLUMNS), (node.id,)).fetchall()
+
+        for row in rows:
+            rel = self._rel(row)
+            outgoing[rel.end][rel.type] = rel
+            types[rel.type].add(rel.end)
+
+        rows = self.conn.execute('SELECT {} FROM rels WHERE end_id = ?'
+                                 .format(REL_COLUMNS), (node.id,)).fetchall()
+
+        for row in rows:
+            rel = self._rel(row)
+            incoming[rel.start][rel.type] = rel
+            types[rel.type].add(rel.start)
+
+        node.__dict__.update({
+            '_outgoing': outgoing,
+            '_incoming': incoming,
+            '_types': types,
+        })
+
+    def _save(self, item):
+        values = (_dumps(item.props), _dumps(item.match_props),
+                  _dumps(item.update_props))
+
+        if isinstance(item, Node):
+            labels = list(item.labels) if item.labels else None
+            self.conn.execute('UPDATE nodes SET props = ?, match_props = ?, '
+                              'update_props = ?, labels = ? WHERE id = ?',
+                              values + (_dumps(labels), item.id))
+        else:
+            self.conn.execute('UPDATE rels SET props = ?, match_props = ?, '
+                              'update_props = ? WHERE id = ?',
+                              values + (item.id,))
+
+    def _add_rel(self, rel):
+        start = rel.start
+        end = rel.end
+
+        for node in (start, end):
+            if getattr(node, '_store', None) is not self:
+                raise ValueError('{} is not stored in this store'
+                                 .format(repr(node)))
+
+        cursor = self.conn.execute(
+            'INSERT INTO rels (start_id, end_id, type, props, match_props, '
+            'update_props) VALUES (?, ?, ?, ?, ?, ?)',
+            (start.id, end.id, rel.type, json.dumps(rel.props),
+             _dumps(rel.match_props), _dumps(rel.update_props)))
+
+        rel.id = cursor.lastrowid
+        rel._store = self
+        self._rels[rel.id] = rel
+
+        # Nodes without loaded relationships read the rel from the
+        # database when they are loaded.
+        if _loaded(start):
+            start._outgoing[end][rel.type] = rel
+            start._types[rel.type].add(end)
+
+        if _loaded(end):
+            end._incoming[start][rel.type] = rel
+            end._types[rel.type].add(start)
+
+        tracker = start._tracker or end._tracker
+        if tracker is not None:
+            tracker.record_add(rel)
+
+    def _remove_rel(self, rel):
+        start = rel.start
+        end = rel.end
+
+        self.conn.execute('DELETE FROM rels WHERE id = ?', (rel.id,))
+        self._rels.pop(rel.id, None)
+
+        if _loaded(start):
+            del start._outgoing[end][rel.type]
+            start._types[rel.type].discard(end)
+
+        if _loaded(end):
+            del end._incoming[start][rel.type]
+            end._types[rel.type].discard(start)
+
+        if rel._tracker is not None:
+            rel._tracker.record_remove(rel)
+
+    def create(self, props=None, labels=None, match_props=None,
+               update_props=None):
+        "Creates a node in the store."
+        props = dict(props) if props else {}
+        labels = list(labels) if labels else None
+
+        cursor = self.conn.execute(
+            'INSERT INTO nodes (labels, props, match_props, update_props) '
+            'VALUES (?, ?, ?, ?)',
+            (_dumps(labels), json.dumps(props), _dumps(match_props),
+             _dumps(update_props)))
+
+        node = self._make_node(cursor.lastrowid, props, labels,
+                               match_props, update_props)
+
+        # A new node has no relationships to load.
+        self._touch(node)
+        node.__dict__.update({
+            '_outgoing': defaultdict(dict),
+            '_incoming': defaultdict(dict),
+            '_types': defaultdict(set),
+        })
+
+        return node
+
+    def get(self, id):
+        "Returns the node with the id."
+        node = self._nodes.get(id)
+
+        if node is not None:
+            return node
+
+        row = self.conn.execute('SELECT {} FROM nodes WHERE id = ?'
+                                .format(NODE_COLUMNS), (id,)).fetchone()
+
+        if row is None:
+            raise KeyError(id)
+
+        return self._node(row)
+
+    def delete(self, node):
+        "Deletes a node and its relationships."
+        node.unrelate()
+
+        self.conn.execute('DELETE FROM nodes WHERE id = ?', (node.id,))
+        self._nodes.pop(node.id, None)
+        self._cache.pop(node.id, None)
+        node._store = None
+
+    def nodes(self):
+        "Iterates over the nodes in the store."
+        cursor = self.conn.execute('SELECT {} FROM nodes ORDER BY id'
+                                   .format(NODE_COLUMNS))
+
+        for row in cursor:
+            yield self._node(row)
+
+    def items(self):
+        """Streams the graph in the array-based format of the JSON Graph
+        Spec without loading the nodes, nodes first. The output can be
+        passed to `graphlib.neo4j.load`.
+        """
+        positions = {}
+
+        cursor = self.conn.execute('SELECT {} FROM nodes ORDER BY id'
+                                   .format(NODE_COLUMNS))
+
+        for id, labels, props, match_props, update_props in cursor:
+            positions[id] = len(positions)
+            data = {'props': json.loads(props)}
+
+            if labels is not None:
+                data['labels'] = json.loads(labels)
+            if match_props is not None:
+                data['match'] = json.loads(match_props)
+            if update_props is not None:
+                data['update'] = json.loads(update_props)
+
+            yield data
+
+        cursor = self.conn.execute('SELECT {} FROM rels ORDER BY id'
+                                   .format(REL_COLUMNS))
+
+        for _, start, end, type, props, match_props, update_props in cursor:
+            data = {
+                'start': positions[start],
+                'end': positions[end],
+                'type': type,
+                'props': json.loads(props),
+            }
+
+            if match_props is not None:
+                data['match'] = json.loads(match_props)
+            if update_props is not None:
+                data['update'] = json.loads(update_props)
+
+            yield data
@@ -0,0 +1,80 @@
+from __future__ import unicode_literals, absolute_import, division
+
+from contextlib import contextmanager
+from collections import defaultdict
+from timeit import default_timer
+
+
+class Stats(object):
+    """Collects timings and counters of the serialize and load phases.
+    Instrumentation is opt-in by passing an instance as the `stats` argument
+    of `Serializer`, `neo4j.parse`, `neo4j.send_request` or `neo4j.load`.
+
+    Phases are `serialize`, `parse`, `clean` (part of `parse`), `encode`
+    and `request`. Each call of `Serializer.serialize` and each request is
+    recorded as a batch. If `callback` is given, it is called with the stats
+    and the batch after each one, for example to log progress of a long
+    running load.
+    """
+    def __init__(self, callback=None):
+        self.times = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.batches = []
+        self.callback = callback
+
+    def add_time(self, phase, seconds):
+        self.times[phase] += seconds
+
+    def incr(self, name, value=1):
+        self.counts[name] += value
+
+    @contextmanager
+    def timer(self, phase):
+        "Times the enclosed block as part of a phase."
+        start = default_timer()
+
+        try:
+            yield
+        finally:
+            self.times[phase] += default_timer() - start
+
+    def add_batch(self, phase, items, seconds, size=None):
+        "Records a batch of items and its latency."
+        batch = {
+            'phase': phase,
+            'items': items,
+            'seconds': seconds,
+            'throughput': items / seconds if seconds else None,
+        }
+
+        if size is not None:
+            batch['bytes'] = size
+
+        self.batches.append(batch)
+
+        if self.callback is not None:
+            self.callback(self, batch)
+
+        return batch
+
+    def summary(self):
+        "Returns the totals and the throughput of each batched phase."
+        batches = defaultdict(lambda: {'batches': 0, 'items': 0,
+                                       'seconds': 0})
+
+        for batch in self.batches:
+            totals = batches[batch['phase']]
+            totals['batches'] += 1
+            totals['items'] += batch['items']
+            totals['seconds'] += batch['seconds']
+
+        for totals in batches.values():
+            seconds = totals['seconds']
+            totals['throughput'] = totals['items'] / seconds \
+                if seconds else None
+
+        return {
+            'times': dict(self.times),
+            'counts': dict(self.counts),
+            'batches': dict(batches),
+        }
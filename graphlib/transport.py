@@ -0,0 +1,229 @@
+"""Transports used to send requests to the Neo4j transaction endpoint.
+
+A transport has a `post(url, data, headers)` method which returns the body
+of the response as bytes and raises `TransportError` for error statuses.
+"""
+from __future__ import unicode_literals, absolute_import
+
+import json
+import select
+import socket
+import threading
+
+try:
+    import http.client as httplib
+    from urllib.parse import urlsplit
+except ImportError:
+    import httplib
+    from urlparse import urlsplit
+
+# Alias str to unicode with unicode_literals imported
+try:
+    str = unicode
+except NameError:
+    pass
+
+
+class TransportError(IOError):
+    "Raised for responses with an error status."
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+        if isinstance(body, bytes):
+            body = body.decode('utf-8', 'replace')
+
+        super(TransportError, self).__init__('{} response: {}'.format(
+            status, body[:200]))
+
+
+class Transport(object):
+    def post(self, url, data, headers):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def _dropped(conn):
+    "Returns true if the server closed an idle connection."
+    if conn.sock is None:
+        return False
+
+    try:
+        # An idle connection is only readable once it is closed.
+        return bool(select.select([conn.sock], [], [], 0)[0])
+    except (socket.error, ValueError):
+        return True
+
+
+class HTTPTransport(Transport):
+    """Transport using the standard library. Connections are kept alive and
+    reused for requests to the same host. Each thread uses its own
+    connections, so a transport can be shared between threads.
+
+    A request is only retried if it failed to be sent on a reused
+    connection, since a request that was sent may have been processed.
+    """
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pools = []
+
+    @property
+    def _connections(self):
+        connections = getattr(self._local, 'connections', None)
+
+        if connections is None:
+            connections = self._local.connections = {}
+
+            with self._lock:
+                self._pools.append(connections)
+
+        return connections
+
+    def _connection(self, scheme, netloc):
+        key = (scheme, netloc)
+        conn = self._connections.get(key)
+
+        if conn is not None:
+            if not _dropped(conn):
+                return conn, True
+
+            self._discard(scheme, netloc)
+
+        if scheme == 'https':
+            cls = httplib.HTTPSConnection
+        else:
+            cls = httplib.HTTPConnection
+
+        if self.timeout is None:
+            conn = cls(netloc)
+        else:
+            conn = cls(netloc, timeout=self.timeout)
+
+        self._connections[key] = conn
+        return conn, False
+
+    def _discard(self, scheme, netloc):
+        conn = self._connections.pop((scheme, netloc), None)
+
+        if conn is not None:
+            conn.close()
+
+    def post(self, url, data, headers):
+        parts = urlsplit(url)
+        path = parts.path or '/'
+
+        if parts.query:
+            path += '?' + parts.query
+
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+
+        while True:
+            conn, reused = self._connection(parts.scheme, parts.netloc)
+
+            try:
+                conn.request('POST', path, body=data, headers=headers)
+                break
+            except socket.error as e:
+                self._discard(parts.scheme, parts.netloc)
+
+                # The server may have closed a reused connection before the
+                # request was sent. Timeouts are not retried as part of the
+                # request may have been received.
+                if not reused or isinstance(e, socket.timeout):
+                    raise
+
+        try:
+            resp = conn.getresponse()
+            body = resp.read()
+        except Exception:
+            self._discard(parts.scheme, parts.netloc)
+            raise
+
+        if resp.will_close:
+            self._discard(parts.scheme, parts.netloc)
+
+        if resp.status >= 400:
+            raise TransportError(resp.status, body)
+
+        return body
+
+    def close(self):
+        """Closes the connections of all threads. It should not be called
+        while requests are in progress.
+        """
+        with self._lock:
+            pools = list(self._pools)
+
+        for connections in pools:
+            for key in list(connections):
+                conn = connections.pop(key, None)
+
+                if conn is not None:
+                    conn.close()
+
+
+class RequestsTransport(Transport):
+    "Transport using a session of the requests library."
+    def __init__(self, session=None):
+        try:
+            import requests
+        except ImportError:
+            raise ImportError('The requests library is required to use the '
+                              'requests transport.')
+
+        self.session = session or requests.Session()
+
+    def post(self, url, data, headers):
+        resp = self.session.post(url, data=data, headers=headers)
+
+        if resp.status_code >= 400:
+            raise TransportError(resp.status_code, resp.content)
+
+        return resp.content
+
+    def close(self):
+        self.session.close()
+
+
+class FakeTransport(Transport):
+    """In-process transport for tests. Requests are recorded as (url, data,
+    headers) tuples and answered with `response`, a dict or a function
+    taking the request and returning one. By default the response has no
+    results or errors.
+    """
+    def __init__(self, response=None):
+        self.response = response
+        self.requests = []
+
+    def post(self, url, data, headers):
+        self.requests.append((url, data, headers))
+        response = self.response
+
+        if callable(response):
+            response = response(url, data, headers)
+
+        if response is None:
+            response = {'results': [], 'errors': []}
+
+        return json.dumps(response).encode('utf-8')
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_transport():
+    "Returns the shared `HTTPTransport` used when none is given."
+    global _default
+
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = HTTPTransport()
+
+    return _default
@@ -0,0 +1,100 @@
+from __future__ import unicode_literals, absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+from graphlib import Node, serialize
+from graphlib.binary import write, read, SnapshotNode
+
+
+class SnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'graph.bin')
+
+        a = Node({'name': 'a', 'age': 30, 'score': 1.5, 'tags': ['x', 'y'],
+                  'ok': True, 'none': None, 'big': 2 ** 70},
+                 labels=['Person'], match_props=['name'])
+        b = Node({'name': 'bé'})
+        c = Node()
+
+        a.relate(b, 'KNOWS', {'since': 2010})
+        b.relate(a, 'KNOWS')
+        c.relate(a, 'LIKES')
+        self.data = serialize(a)
+        write(self.data, self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_items(self):
+        with read(self.path) as s:
+            self.assertEqual(len(s), 3)
+            items = list(s.items())
+
+        key = lambda d: sorted(d.items())
+        self.assertCountEqual([key(d) for d in items],
+                              [key(d) for d in self.data])
+
+    def test_nodes(self):
+        with read(self.path) as s:
+            a = s.node(0)
+
+            self.assertIsInstance(a, SnapshotNode)
+            self.assertIs(s.node(0), a)
+            self.assertEqual(a.labels, ['Person'])
+            self.assertEqual(a.match_props, ['name'])
+            self.assertEqual(a['tags'], ['x', 'y'])
+            self.assertEqual(a['big'], 2 ** 70)
+            self.assertEqual(len(s._nodes), 1)
+
+            # Rels are read on access
+            self.assertEqual(a.degree, 2)
+            self.assertEqual(len(a.rels(type='KNOWS')), 2)
+
+            b = [n for n in a.neighbors if n.props.get('name') == 'bé'][0]
+            rel = a.rels(b, outgoing=True)[0]
+            self.assertEqual(rel['since'], 2010)
+            self.assertIs(b.rels(a, incoming=True)[0], rel)
+
+            self.assertEqual(len(list(a.traverse())), 3)
+            self.assertRaises(IndexError, s.node, 3)
+
+        # Loaded nodes remain usable after closing
+        a.relate(Node(), 'KNOWS')
+        self.assertEqual(a.degree, 3)
+
+    def test_dict(self):
+        data = {
+            'nodes': [{'props': {'i': 0}}, {'props': {'i': 1}}],
+            'rels': [{'start': 1, 'end': 0, 'type': 'R', 'props': {}}],
+        }
+        write(data, self.path)
+
+        with read(self.path) as s:
+            self.assertEqual(s.node(1).rels()[0].end, s.node(0))
+
+    def test_match_false(self):
+        a = Node({'name': 'a'})
+        b = Node({'name': 'b'})
+        a.relate(b, 'KNOWS').match_props = False
+        data = serialize(a)
+        write(data, self.path)
+
+        with read(self.path) as s:
+            items = list(s.items())
+            rel = s.node(0).rels()[0]
+
+            self.assertIs(rel.match_props, False)
+
+        self.assertIs(items[2]['match'], False)
+        key = lambda d: sorted(d.items())
+        self.assertCountEqual([key(d) for d in items],
+                              [key(d) for d in data])
+
+    def test_invalid(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'{}' * 64)
+
+        self.assertRaises(ValueError, read, self.path)
@@ -0,0 +1,29 @@
+from __future__ import unicode_literals, absolute_import
+
+import unittest
+from graphlib import codec
+
+
+class CodecTestCase(unittest.TestCase):
+    def tearDown(self):
+        codec.use()
+
+    def test_backends(self):
+        value = {'a': [1, 2.5, None, True], 'b': 'é', 'c': 2 ** 70}
+        backends = ['json']
+
+        if codec.orjson is not None:
+            backends.append('orjson')
+            codec.use()
+            self.assertEqual(codec.backend(), 'orjson')
+
+        for name in backends:
+            codec.use(name)
+            self.assertEqual(codec.backend(), name)
+
+            self.assertIsInstance(codec.dumpb(value), bytes)
+            self.assertEqual(codec.loads(codec.dumpb(value)), value)
+            self.assertEqual(codec.loads(codec.dumps(value)), value)
+
+        self.assertRaises(ValueError, codec.use, 'xml')
+        self.assertRaises(ValueError, codec.loads, '{')
@@ -0,0 +1,59 @@
+from __future__ import unicode_literals, absolute_import
+
+import unittest
+from graphlib import Node, Nodes
+
+try:
+    from graphlib.columnar import Columns
+except ImportError:
+    Columns = None
+
+
+@unittest.skipIf(Columns is None, 'numpy is not installed')
+class ColumnsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.nodes = Nodes([
+            Node({'name': 'c', 'age': 30, 'score': 1.5}),
+            Node({'name': 'a', 'age': 20}),
+            Node({'name': 'b', 'score': 0.5}),
+            Node({'name': 'a', 'age': 40, 'score': None}),
+        ])
+        self.columns = Columns(self.nodes, ['name', 'age', 'score'])
+
+    def test_extract(self):
+        self.assertEqual(self.columns['age'].values.dtype.kind, 'i')
+        self.assertEqual(self.columns['score'].values.dtype.kind, 'f')
+        self.assertEqual(self.columns['name'].values.dtype.kind, 'O')
+        self.assertEqual(self.columns['score'].mask.tolist(),
+                         [True, False, True, False])
+
+    def test_filter(self):
+        n = self.nodes
+        c = self.columns
+
+        self.assertIsInstance(c.filter('age'), Nodes)
+        self.assertEqual(c.filter('age'), [n[0], n[1], n[3]])
+        self.assertEqual(c.filter('name', 'a'), [n[1], n[3]])
+        self.assertEqual(c.select(c.where('age', '>=', 30)), [n[0], n[3]])
+
+        mask = c.where('age', '>', 10) & c.where('name', '!=', 'c')
+        self.assertEqual(c.select(mask), [n[1], n[3]])
+
+    def test_sort(self):
+        n = self.nodes
+        c = self.columns
+
+        self.assertEqual(c.sort('age'), [n[1], n[0], n[3], n[2]])
+        self.assertEqual(c.sort('age', reverse=True), [n[3], n[0], n[1], n[2]])
+        self.assertEqual(c.sort('name'), [n[1], n[3], n[2], n[0]])
+
+    def test_aggregate(self):
+        c = self.columns
+
+        self.assertEqual(c.count('age'), 3)
+        self.assertEqual(c.sum('age'), 90)
+        self.assertEqual(c.mean('age'), 30)
+        self.assertEqual(c.min('score'), 0.5)
+        self.assertEqual(c.max('age', mask=c.where('name', '==', 'a')), 40)
+        self.assertEqual(c.counts('name'), {'a': 2, 'b': 1, 'c': 1})
+        self.assertIsNone(c.mean('age', mask=c.where('name', '==', 'b')))
@@ -0,0 +1,127 @@
+from __future__ import unicode_literals, absolute_import
+
+import unittest
+from graphlib import Node, Nodes, Rels, serialize
+from graphlib.csr import freeze, to_arrays
+
+
+class CSRGraphTestCase(unittest.TestCase):
+    def setUp(self):
+        self.n0 = Node({'name': 'a'}, labels=['Special'])
+        self.n1 = Node({'name': 'b'})
+        self.n2 = Node({'name': 'c'})
+        self.n3 = Node()
+
+        self.r0 = self.n0.relate(self.n1, 'X', {'foo': 1})
+        self.r1 = self.n0.relate(self.n2, 'Y')
+        self.r2 = self.n2.relate(self.n0, 'X')
+
+        self.graph = freeze(self.n0)
+
+    def test_freeze(self):
+        g = self.graph
+
+        self.assertEqual(len(g), 3)
+        self.assertEqual(len(g.rels), 3)
+        self.assertEqual(g.id(self.n0), 0)
+        self.assertIs(g.node(0), self.n0)
+        self.assertCountEqual(g.types, ['X', 'Y'])
+
+        # Disconnected nodes are included when passed
+        self.assertEqual(len(freeze([self.n1, self.n3])), 4)
+
+    def test_degree(self):
+        g = self.graph
+        i = g.id(self.n0)
+
+        self.assertEqual(g.out_degree(i), 2)
+        self.assertEqual(g.in_degree(i), 1)
+        self.assertEqual(g.degree(i), 3)
+        self.assertEqual(g.degree(g.id(self.n1)), 1)
+
+    def test_edges(self):
+        g = self.graph
+        i = g.id(self.n0)
+
+        edges = list(g.edges(i, direction=-1))
+        self.assertEqual(len(edges), 1)
+        rel, other, code = edges[0]
+        self.assertIs(g.rel(rel), self.r2)
+        self.assertEqual(other, g.id(self.n2))
+        self.assertEqual(g.types[code], 'X')
+
+        self.assertCountEqual(g.neighbors(i), [g.id(self.n1), g.id(self.n2)])
+        self.assertEqual(g.neighbors(i, 'Y'), [g.id(self.n2)])
+        self.assertEqual(g.neighbors(i, 'X', direction=1), [g.id(self.n1)])
+
+        # Unknown types have no rels, as with Node.rels
+        self.assertEqual(list(g.edges(i, 'B')), [])
+        self.assertEqual(g.neighbors(i, 'B'), [])
+        self.assertEqual(list(g.traverse(i, 'B')), [i])
+        self.assertEqual(self.n0.rels(type='B'), [])
+
+        rels = g.to_rels(r for r, _, _ in g.edges(i, direction=1))
+        self.assertIsInstance(rels, Rels)
+        self.assertCountEqual(rels, [self.r0, self.r1])
+
+    def test_traverse(self):
+        g = self.graph
+        nodes = g.to_nodes(g.traverse(g.id(self.n1)))
+
+        self.assertIsInstance(nodes, Nodes)
+        self.assertCountEqual(nodes, [self.n0, self.n1, self.n2])
+        self.assertEqual(len(list(g.traverse(0, max_depth=0))), 1)
+        self.assertEqual(len(list(g.traverse(g.id(self.n1), direction=1))),
+                         1)
+
+    def test_serialize(self):
+        items = self.graph.serialize()
+
+        self.assertEqual(len(items), 6)
+        self.assertEqual(items[0], {'props': {'name': 'a'},
+                                    'labels': ['Special']})
+
+        # Same content as the object serializer
+        key = lambda d: sorted(d.items())
+        self.assertCountEqual([key(d) for d in items if 'type' not in d],
+                              [key(d) for d in serialize(self.n0)
+                               if 'type' not in d])
+
+    def test_to_arrays(self):
+        start, end, codes, nodes, types = to_arrays(self.n0)
+
+        self.assertEqual(len(nodes), 3)
+        self.assertIs(nodes[0], self.n0)
+
+        edges = [(nodes[s], nodes[e], types[c])
+                 for s, e, c in zip(start, end, codes)]
+        self.assertCountEqual(edges, [(self.n0, self.n1, 'X'),
+                                      (self.n0, self.n2, 'Y'),
+                                      (self.n2, self.n0, 'X')])
+
+        # Same edges from either serialized format
+        data = serialize(self.n0)
+        start, end, codes, nodes, types = to_arrays(data)
+
+        self.assertEqual(len(nodes), 3)
+        self.assertEqual(nodes[0], {'props': {'name': 'a'},
+                                    'labels': ['Special']})
+        self.assertCountEqual(
+            [(nodes[s]['props'].get('name'), nodes[e]['props'].get('name'),
+              types[c]) for s, e, c in zip(start, end, codes)],
+            [('a', 'b', 'X'), ('a', 'c', 'Y'), ('c', 'a', 'X')])
+
+        # Iterators are read once
+        _start, _end, _codes, _nodes, _types = to_arrays(iter(data))
+        self.assertEqual(list(_start), list(start))
+        self.assertEqual(_nodes, nodes)
+
+        _start, _end, _codes, _nodes, _types = to_arrays(iter([self.n0]))
+        self.assertEqual(len(_nodes), 3)
+        self.assertEqual(len(to_arrays(iter([]))[0]), 0)
+
+        data = {'nodes': [{}, {}], 'rels': [{'start': 1, 'end': 0,
+                                             'type': 'Z'}]}
+        start, end, codes, nodes, types = to_arrays(data)
+        self.assertEqual((list(start), list(end), list(codes), types),
+                         ([1], [0], [0], ['Z']))
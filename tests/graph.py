@@ -1,8 +1,13 @@
 from __future__ import unicode_literals, absolute_import
 
+import io
 import sys
+import copy
+import pickle
 import unittest
-from graphlib import Node, Nodes
+from graphlib import Node, Nodes, Rels, shortest_path, k_hop, relate_many, \
+    from_edges, NodeRegistry, serialize, snapshot, restore
+from graphlib.graph import ChangeTracker, InternTable, TYPES, read_edges
 
 if sys.version_info < (3, 0):
     unittest.TestCase.assertCountEqual = unittest.TestCase.assertItemsEqual
@@ -159,6 +164,359 @@ class GraphTestCase(unittest.TestCase):
         self.assertCountEqual(s.rels(direction=1), [r0, r2])
         self.assertCountEqual(s.rels(direction=-1), [r1])
 
+    def test_tracker(self):
+        t = ChangeTracker()
+        s = Node()
+        e = Node()
+
+        # Untracked items are not recorded
+        s['one'] = 1
+        r0 = s.relate(e, 'A')
+        self.assertEqual(t.checkpoint(), ([], set(), []))
+
+        t.track(s)
+        t.track(r0)
+        s['one'] = 2
+        r1 = e.relate(s, 'B')
+        s.unrelate(e, 'A')
+        e['two'] = 2
+
+        self.assertEqual(t.checkpoint(), ([r1], {s}, [r0]))
+        self.assertEqual(t.checkpoint(), ([], set(), []))
+
+        t.untrack(s)
+        s.update({'three': 3})
+        self.assertEqual(t.checkpoint(), ([], set(), []))
+
+    def test_traverse(self):
+        n0, n1, n2, n3, n4 = [Node({'i': i}) for i in range(5)]
+
+        r0 = n0.relate(n1, 'A')
+        r1 = n0.relate(n2, 'B')
+        r2 = n1.relate(n3, 'A')
+        r3 = n4.relate(n2, 'A')
+
+        bfs = list(n0.traverse())
+        self.assertEqual(bfs[0], n0)
+        self.assertCountEqual(bfs[1:3], [n1, n2])
+        self.assertCountEqual(bfs[3:], [n3, n4])
+
+        dfs = list(n0.traverse('dfs'))
+        self.assertEqual(dfs[0], n0)
+        self.assertCountEqual(dfs, bfs)
+        # Depth-first descends before visiting siblings
+        self.assertEqual(dfs.index(n3), dfs.index(n1) + 1)
+
+        self.assertEqual(list(n0.traverse(max_depth=0)), [n0])
+        self.assertCountEqual(n0.traverse(max_depth=1), [n0, n1, n2])
+        self.assertCountEqual(n0.traverse(types='A'), [n0, n1, n3])
+        self.assertCountEqual(n2.traverse(direction=-1), [n2, n0, n4])
+        self.assertCountEqual(n2.traverse(outgoing=True), [n2])
+
+        self.assertCountEqual(n0.traverse(yields='rels'), [r0, r1, r2, r3])
+        self.assertCountEqual(n0.traverse(yields='rels', max_depth=1),
+                              [r0, r1])
+
+        # Nodes first reached by a longer path are expanded again when
+        # reached by a shorter one.
+        a, b, c, d = Node(), Node(), Node(), Node()
+        a.relate(b, 'A')
+        b.relate(c, 'A')
+        a.relate(c, 'A')
+        c.relate(d, 'A')
+        self.assertEqual(list(a.traverse('dfs', max_depth=2)), [a, b, c, d])
+        self.assertEqual(list(a.traverse('dfs', max_depth=1)), [a, b, c])
+
+        paths = list(n0.traverse('dfs', yields='paths', types=['A']))
+        self.assertEqual(paths[0], (n0,))
+        self.assertIn((n0, r0, n1, r2, n3), paths)
+
+        # Generators stop early
+        self.assertEqual(next(n0.traverse()), n0)
+
+        self.assertRaises(ValueError, list, n0.traverse('x'))
+        self.assertRaises(ValueError, list, n0.traverse(yields='x'))
+
+
+class BulkTestCase(unittest.TestCase):
+    def test_relate_many(self):
+        n0, n1, n2 = Node(), Node(), Node()
+
+        rels = relate_many([(n0, n1, 'A'), (n1, n2, 'A', {'w': 1}),
+                            (n0, n1, 'A', {'w': 2})])
+
+        self.assertEqual(len(rels), 3)
+        self.assertIs(rels[0], rels[2])
+        self.assertEqual(rels[0].props, {'w': 2})
+        self.assertEqual(rels[1].props, {'w': 1})
+
+        # Same structure as relate
+        self.assertTrue(n0.related(n1, 'A', outgoing=True))
+        self.assertTrue(n1.related(n0, 'A', incoming=True))
+        self.assertCountEqual(n1.neighbors, [n0, n2])
+        self.assertEqual(n0.relate(n1, 'A'), rels[0])
+
+        rels = relate_many([(n0, n1, 'A', {'w': 3})], duplicates='ignore')
+        self.assertEqual(rels[0].props, {'w': 2})
+
+        self.assertRaises(ValueError, relate_many, [(n0, n1, 'A')],
+                          duplicates='error')
+        self.assertRaises(ValueError, relate_many, [], duplicates='x')
+
+    def test_from_edges(self):
+        nodes = from_edges([(1, 2, 'A'), (2, 3, 'A', {'w': 1}), (3, 1, 'B')])
+
+        self.assertCountEqual(nodes, [1, 2, 3])
+        self.assertEqual(nodes[1]['id'], 1)
+        self.assertTrue(nodes[1].related(nodes[2], 'A', outgoing=True))
+        self.assertEqual(nodes[2].rels(nodes[3])[0].props, {'w': 1})
+
+        # Existing nodes are reused
+        nodes = from_edges([(3, 4, 'C')], nodes=nodes, key='name')
+        self.assertEqual(len(nodes), 4)
+        self.assertEqual(nodes[4]['name'], 4)
+        self.assertEqual(nodes[3].degree, 3)
+
+    def test_read_edges(self):
+        f = io.StringIO('start,end,type,weight\n'
+                        'a,b,KNOWS,1\n'
+                        'b,c,KNOWS,\n')
+
+        edges = list(read_edges(f))
+        self.assertEqual(edges, [('a', 'b', 'KNOWS', {'weight': '1'}),
+                                 ('b', 'c', 'KNOWS', {})])
+
+        f.seek(0)
+        nodes = from_edges(read_edges(f))
+        self.assertEqual(nodes['b'].degree, 2)
+
+
+class SnapshotTestCase(unittest.TestCase):
+    def test_restore(self):
+        a = Node({'name': 'a'}, labels=['Person'], match_props=['name'])
+        b = Node({'name': 'b'})
+        c = Node()
+        r = a.relate(b, 'KNOWS', {'since': 2010})
+        b.relate(c, 'KNOWS')
+        c.relate(a, 'LIKES')
+
+        state = snapshot([a, r])
+        self.assertEqual(len(state['nodes']), 3)
+        self.assertEqual(len(state['rels']), 3)
+
+        _a, _r = restore(state)
+
+        self.assertIsNot(_a, a)
+        self.assertEqual(_a.props, {'name': 'a'})
+        self.assertEqual(_a.labels, ['Person'])
+        self.assertEqual(_a.match_props, ['name'])
+        self.assertIs(_r.start, _a)
+        self.assertEqual(_r['since'], 2010)
+        self.assertEqual(_a.degree, 2)
+        self.assertEqual(len(list(_a.traverse())), 3)
+        self.assertEqual(restore(snapshot(a)).props, {'name': 'a'})
+
+        # Copies are independent of the original
+        _a['name'] = 'x'
+        _a.match_props.append('age')
+        _r['since'] = 2020
+        self.assertEqual(a.props, {'name': 'a'})
+        self.assertEqual(a.match_props, ['name'])
+        self.assertEqual(r['since'], 2010)
+
+        state = snapshot(a)
+        a['name'] = 'y'
+        self.assertEqual(restore(state)['name'], 'a')
+        self.assertIsNot(restore(state).props, restore(state).props)
+
+    def test_pickle(self):
+        nodes = [Node({'i': i}) for i in range(sys.getrecursionlimit() * 2)]
+
+        for n0, n1 in zip(nodes, nodes[1:]):
+            n0.relate(n1, 'NEXT')
+
+        # Deep graphs are pickled as snapshots
+        head = restore(pickle.loads(pickle.dumps(snapshot(nodes[0]))))
+        self.assertEqual([n['i'] for n in head.traverse()],
+                         list(range(len(nodes))))
+
+        nodes = [Node({'i': i}) for i in range(3)]
+        nodes[0].relate(nodes[1], 'NEXT')
+        nodes[1].relate(nodes[2], 'NEXT')
+
+        items = Nodes(nodes)
+        _items = pickle.loads(pickle.dumps(items))
+        self.assertIsInstance(_items, Nodes)
+        self.assertEqual([n['i'] for n in _items], [0, 1, 2])
+        self.assertTrue(_items[0].related(_items[1], 'NEXT'))
+
+        rels = pickle.loads(pickle.dumps(nodes[0].rels()))
+        self.assertIsInstance(rels, Rels)
+        self.assertEqual(rels[0].end['i'], 1)
+
+        # Shallow copies share the attributes
+        _head = copy.copy(nodes[0])
+        self.assertIs(_head.props, nodes[0].props)
+
+    def test_shared(self):
+        a = Node({'name': 'a'}, labels=['Person'])
+        b = Node({'name': 'b'})
+        a.relate(b, 'KNOWS')
+
+        tracker = ChangeTracker()
+        tracker.track(a)
+
+        for _a, _b in (pickle.loads(pickle.dumps([a, b])),
+                       copy.deepcopy([a, b])):
+            # Items pickled together stay in one graph
+            self.assertTrue(_a.related(_b, 'KNOWS'))
+            self.assertIs(_a.rels()[0].end, _b)
+            self.assertEqual(_a.labels, ['Person'])
+            self.assertIs(_a._tracker, None)
+
+
+class InternTestCase(unittest.TestCase):
+    def test_table(self):
+        t = InternTable()
+        a = ''.join(['a', 'b'])
+
+        self.assertIs(t.intern(a), a)
+        self.assertIs(t.intern(''.join(['a', 'b'])), a)
+        self.assertEqual(t.intern('c'), 'c')
+        self.assertEqual(len(t), 2)
+
+    def test_shared(self):
+        # Built at runtime so the strings are not shared by the compiler.
+        type = ''.join(['LIK', 'ES'])
+        a, b, c = Node(), Node(), Node()
+        r0 = a.relate(b, type)
+        r1 = b.relate(c, ''.join(['LIK', 'ES']))
+        r2 = relate_many([(c, a, ''.join(['LIK', 'ES']))])[0]
+
+        self.assertIs(r0.type, r1.type)
+        self.assertIs(r0.type, r2.type)
+        self.assertIs(TYPES.intern(''.join(['LIK', 'ES'])), r0.type)
+
+        n0 = Node(labels=['Person', ''.join(['Auth', 'or'])])
+        n1 = Node(labels=['Person', ''.join(['Auth', 'or'])])
+        self.assertEqual(n0.labels, ['Person', 'Author'])
+        self.assertIs(n0.labels[1], n1.labels[1])
+
+        # Labels stay a list
+        n0.labels.append('Admin')
+        self.assertEqual(n1.labels, ['Person', 'Author'])
+
+    def test_limit(self):
+        t = InternTable(limit=1)
+        a = ''.join(['a', 'b'])
+
+        self.assertIs(t.intern(a), a)
+        self.assertIs(t.intern(''.join(['a', 'b'])), a)
+
+        # Values past the limit are not shared
+        b = ''.join(['c', 'd'])
+        self.assertIs(t.intern(b), b)
+        self.assertIsNot(t.intern(''.join(['c', 'd'])), b)
+        self.assertEqual(len(t), 1)
+
+
+class NodeRegistryTestCase(unittest.TestCase):
+    def test_get_or_create(self):
+        r = NodeRegistry()
+
+        n = r.get_or_create(['City'], {'name': 'Philadelphia'})
+        self.assertEqual(n.props, {'name': 'Philadelphia'})
+        self.assertEqual(n.labels, ['City'])
+        self.assertEqual(n.match_props, ['name'])
+
+        # Same entity from another feed
+        o = r.get_or_create(['City'], {'name': 'Philadelphia'},
+                            {'state': 'PA'})
+        self.assertIs(o, n)
+        self.assertEqual(n['state'], 'PA')
+
+        self.assertIsNot(r.get_or_create(['Person'], {'name': 'Philadelphia'}),
+                         n)
+        self.assertIs(r.get(['City'], {'name': 'Philadelphia'}), n)
+        self.assertIsNone(r.get(['City'], {'name': 'Boston'}))
+        self.assertEqual(len(r), 2)
+        self.assertIn(n, list(r))
+
+        # Duplicates are merged before serialization
+        people = [Node() for _ in range(3)]
+        for p in people:
+            p.relate(r.get_or_create(['City'], {'name': 'Philadelphia'}),
+                     'LIVES_IN')
+        self.assertEqual(len(serialize(people[0])), 7)
+
+    def test_add(self):
+        r = NodeRegistry()
+        n = Node({'id': [1, 2]}, labels=['A', 'B'], match_props=['id'])
+
+        self.assertIs(r.add(n), n)
+        self.assertIs(r.get_or_create(['B', 'A'], {'id': [1, 2]}), n)
+        self.assertIs(r.add(Node({'id': [1, 2]}, labels=['A', 'B'],
+                                 match_props=['id'])), n)
+
+        self.assertRaises(ValueError, r.add, Node())
+        self.assertRaises(KeyError, r.add, Node(match_props=['id']))
+
+
+class PathsTestCase(unittest.TestCase):
+    def setUp(self):
+        # n0 -A-> n1 -A-> n2 -A-> n3 and a shortcut n0 -B-> n4 -B-> n3
+        self.nodes = [Node({'i': i}) for i in range(6)]
+        n0, n1, n2, n3, n4, n5 = self.nodes
+
+        n0.relate(n1, 'A')
+        n1.relate(n2, 'A')
+        n2.relate(n3, 'A')
+        n0.relate(n4, 'B')
+        n4.relate(n3, 'B')
+
+    def test_shortest_path(self):
+        n0, n1, n2, n3, n4, n5 = self.nodes
+
+        self.assertEqual(shortest_path(n0, n3), [n0, n4, n3])
+        self.assertEqual(shortest_path(n3, n0), [n3, n4, n0])
+        self.assertEqual(shortest_path(n0, n3, 'A'), [n0, n1, n2, n3])
+        self.assertEqual(shortest_path(n0, n0), [n0])
+        self.assertIsInstance(shortest_path(n0, n1), Nodes)
+
+        # Direction is relative to the start node
+        self.assertEqual(shortest_path(n0, n3, direction=1), [n0, n4, n3])
+        self.assertIsNone(shortest_path(n3, n0, direction=1))
+        self.assertEqual(shortest_path(n3, n0, incoming=True), [n3, n4, n0])
+
+        self.assertIsNone(shortest_path(n0, n5))
+
+    def test_shortest_path_uneven(self):
+        # The first meeting node found is not on the shortest path
+        s, e = Node(), Node()
+        a, b, c = Node(), Node(), Node()
+
+        s.relate(a, 'X')
+        a.relate(b, 'X')
+        b.relate(c, 'X')
+        c.relate(e, 'X')
+        s.relate(e, 'X')
+
+        self.assertEqual(len(shortest_path(s, e)), 2)
+
+    def test_k_hop(self):
+        n0, n1, n2, n3, n4, n5 = self.nodes
+
+        self.assertCountEqual(k_hop(n0, 0), [])
+        self.assertCountEqual(k_hop(n0, 1), [n1, n4])
+        self.assertCountEqual(k_hop(n0, 2), [n1, n2, n3, n4])
+        self.assertCountEqual(k_hop(n0, 2, 'A'), [n1, n2])
+        self.assertCountEqual(k_hop(n3, 1, direction=-1), [n2, n4])
+        self.assertIsInstance(k_hop(n0, 1), Nodes)
+
+        # Ordered by distance
+        self.assertCountEqual(k_hop(n0, 2)[:2], [n1, n4])
+        self.assertCountEqual(k_hop(n0, 5, direction=1), k_hop(n0, 2))
+
 
 class DictSeqTestCase(unittest.TestCase):
     def test_filter(self):
@@ -188,6 +546,63 @@ class DictSeqTestCase(unittest.TestCase):
         f = lambda n: n.props.get('order')
         self.assertCountEqual(items.sort(f), [n0, n1, n2])
 
+    def test_index_by(self):
+        n0 = Node({'name': 'a', 'order': 2})
+        n1 = Node({'name': 'b', 'order': 0})
+        n2 = Node({'name': 'a', 'order': 1})
+        n3 = Node({'tags': ['x']})
+        items = Nodes([n0, n1, n2, n3])
+
+        index = items.index_by('name')
+        self.assertIs(items.index_by('name'), index)
+        self.assertEqual(index.lookup('a'), [0, 2])
+        self.assertEqual(index.lookup('c'), [])
+        self.assertFalse(index.complete)
+
+        # Filtering uses the index and preserves order
+        self.assertEqual(items.filter('name', 'a', index=index), [n0, n2])
+        self.assertEqual(items.filter('name', 'c', index=index), [])
+        self.assertEqual(items.filter('name', index=index), [n0, n1, n2])
+
+        # Unhashable values
+        tags = items.index_by('tags')
+        self.assertEqual(tags.lookup(['y']), [])
+        self.assertEqual(items.filter('tags', ['x'], index=tags), [n3])
+
+        # The index is only used when passed
+        n1['name'] = 'a'
+        self.assertEqual(items.filter('name', 'a'), [n0, n1, n2])
+        self.assertEqual(items.filter('name', 'a', index=index), [n0, n2])
+
+        self.assertRaises(ValueError, items.filter, 'order', index=index)
+        self.assertRaises(ValueError, Nodes([n0]).filter, 'name',
+                          index=index)
+
+        # Containers of the same length do not share indexes
+        other = Nodes([n3, n2, n1, n0])
+        self.assertRaises(ValueError, other.filter, 'name', 'a',
+                          index=index)
+        self.assertRaises(ValueError, other.range, 'name', 'a',
+                          index=index)
+
+        # Sorting only uses a complete index
+        items = Nodes([n0, n1, n2])
+        order = items.index_by('order')
+        self.assertEqual(items.sort('order', index=order), [n1, n2, n0])
+        self.assertEqual(items.range('order', 1, index=order), [n2, n0])
+
+        n1['order'] = 3
+        self.assertEqual(items.sort('order'), [n2, n0, n1])
+        self.assertEqual(items.range('order', 1), [n2, n0, n1])
+
+    def test_range(self):
+        nodes = [Node({'order': i}) for i in range(5)]
+        items = Nodes(reversed(nodes))
+
+        self.assertEqual(items.range('order', 1, 3), nodes[1:3])
+        self.assertEqual(items.range('order', lower=3), nodes[3:])
+        self.assertEqual(items.range('order', upper=2), nodes[:2])
+
     def test_match(self):
         items = Nodes([1, 2, 13])
         self.assertCountEqual(items.match(r'1'), [1, 13])
@@ -1,10 +1,20 @@
 from __future__ import absolute_import, unicode_literals
 
 import os
+import sys
+import json
 import unittest
 from graphlib import Node, serialize
 from graphlib.serializer import convert_array_to_dict
 from graphlib import neo4j
+from graphlib.stats import Stats
+from graphlib.transport import FakeTransport
+from graphlib.codec import dumpb
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
 
 NEO4J_ENDPOINT = os.environ.get('NEO4J_ENDPOINT')
 
@@ -82,10 +92,193 @@ class Neo4jParserTestCase(unittest.TestCase):
         # Third statement.. after creating the nodes
         self.assertEqual(neo4j.parse(serialize(r))[2], s)
 
+    def test_diff(self):
+        a = Node({'id': 1, 'name': 'a'}, labels=['P'], match_props=['id'])
+        b = Node({'id': 2}, labels=['P'], match_props=['id'])
+        c = Node({'id': 3}, labels=['P'], match_props=['id'])
+        a.relate(b, 'K')
+        b.relate(c, 'K')
+
+        old = serialize(a)
+
+        # No changes
+        self.assertEqual(neo4j.diff(old, old), [])
+        self.assertEqual(neo4j.diff(convert_array_to_dict(serialize(a)),
+                                    old), [])
+
+        a['name'] = 'b'
+        b.unrelate(c)
+        a.relate(Node({'v': 1}), 'L')
+
+        statements = neo4j.diff(old, serialize(a))
+        self.assertEqual(statements, [
+            'OPTIONAL MATCH (:P {id: 2})-[x5:K]->(:P {id: 3})',
+            'DELETE x5',
+            'WITH count(*) AS x6',
+            'OPTIONAL MATCH (x7:P {id: 3})',
+            'OPTIONAL MATCH (x7)-[x7r]-()',
+            'DELETE x7r, x7',
+            'WITH count(*) AS x8',
+            "MERGE (x0:P {id: 1}) ON CREATE SET x0 = {id: 1, name: 'b'} "
+            "ON MATCH SET x0.name = 'b'",
+            'CREATE (x2 {v: 1})',
+            'MERGE (x0)-[x4:L]->(x2)',
+        ])
+
+    def test_diff_remove_nodes(self):
+        hub = Node({'id': 0}, labels=['P'], match_props=['id'])
+        a = Node({'id': 1}, labels=['P'], match_props=['id'])
+        b = Node({'id': 2}, labels=['P'], match_props=['id'])
+
+        for i in range(3):
+            leaf = Node({'id': 10 + i}, labels=['L'], match_props=['id'])
+            a.relate(leaf, 'X')
+            b.relate(leaf, 'Y')
+
+        hub.relate([a, b], 'H')
+        old = serialize(hub)
+
+        hub.unrelate(a)
+        hub.unrelate(b)
+        new = serialize(hub)
+
+        statements = neo4j.diff(old, new)
+
+        # Each removal is matched and deleted on its own
+        segments = ' '.join(statements).split(' WITH count(*) AS ')
+        self.assertEqual(len(segments), len(old) - len(new) + 1)
+
+        nodes = [segment for segment in segments if 'r]-()' in segment]
+        self.assertEqual(len(nodes), 5)
+
+        for segment in segments[:-1]:
+            self.assertEqual(segment.count('DELETE'), 1)
+            self.assertLessEqual(segment.count('OPTIONAL MATCH'), 2)
+
+    def test_diff_replace(self):
+        n = Node({'id': 1, 'name': 'a'}, labels=['P'], match_props=['id'])
+        old = serialize(n)
+        del n['name']
+
+        self.assertEqual(neo4j.diff(old, serialize(n)), [
+            'MERGE (x0:P {id: 1}) ON CREATE SET x0 = {id: 1} '
+            'ON MATCH SET x0 = {id: 1}',
+        ])
+
+    def test_diff_bind(self):
+        s = Node({'id': 1}, labels=['P'], match_props=['id'])
+        e = Node({'name': 'e'})
+        old = serialize(s)
+        s.relate(e, 'R', {'w': 1})
+
+        # Unchanged nodes are bound for new relationships
+        self.assertEqual(neo4j.diff(old, serialize(s))[0],
+                         'MERGE (x0:P {id: 1})')
+
+    def test_coalesce(self):
+        items = [
+            {'props': {'id': 1, 'a': 1}, 'labels': ['P'], 'match': ['id']},
+            {'props': {'id': 2}, 'labels': ['P'], 'match': ['id']},
+            {'start': 0, 'end': 1, 'type': 'K'},
+            {'props': {'id': 1, 'b': 2, 'a': None}, 'labels': ['P'],
+             'match': ['id']},
+            {'start': 3, 'end': 1, 'type': 'K', 'props': {'w': 1}},
+            {'props': {}},
+            {'props': {}},
+            {'start': 5, 'end': 6, 'type': 'K', 'match': False},
+            {'start': 5, 'end': 6, 'type': 'K', 'match': False},
+        ]
+        copy = [dict(item) for item in items]
+
+        self.assertEqual(list(neo4j.coalesce(items)), [
+            {'props': {'id': 1, 'a': 1, 'b': 2}, 'labels': ['P'],
+             'match': ['id']},
+            {'props': {'id': 2}, 'labels': ['P'], 'match': ['id']},
+            {'start': 0, 'end': 1, 'type': 'K', 'props': {'w': 1}},
+            {'props': {}},
+            {'props': {}},
+            {'start': 3, 'end': 4, 'type': 'K', 'match': False},
+            {'start': 3, 'end': 4, 'type': 'K', 'match': False},
+        ])
+
+        # Input is not modified
+        self.assertEqual(items, copy)
+
+        # Only duplicates within the buffer are merged
+        self.assertEqual(len(list(neo4j.coalesce(items, size=1))), 9)
+
+        # Dict format and parsing the stream
+        n = Node({'id': 1}, match_props=['id'])
+        n.relate(Node({'id': 2}, match_props=['id']), 'TO')
+        data = convert_array_to_dict(serialize(n) + serialize(n))
+        statements = neo4j.parse(neo4j.coalesce(data))
+        self.assertEqual(statements, neo4j.parse(serialize(n)))
+
     def test_parse(self):
         statements = neo4j.parse(self.data)
         self.assertTrue(statements)
 
+    def test_parse_stats(self):
+        stats = Stats()
+        statements = neo4j.parse(self.data, stats=stats)
+
+        self.assertEqual(stats.counts['statements'], len(statements))
+        self.assertGreater(stats.times['parse'], 0)
+        self.assertLessEqual(stats.times['clean'], stats.times['parse'])
+
+    def test_parse_stream_stats(self):
+        stats = Stats()
+        stdout = sys.stdout
+        sys.stdout = StringIO()
+
+        try:
+            self.assertEqual(neo4j.parse(self.data, stream=True, stats=stats),
+                             [])
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+
+        # Streamed statements are counted as they are printed
+        statements = neo4j.parse(self.data)
+        self.assertEqual(stats.counts['statements'], len(statements))
+        self.assertEqual(output, ''.join(s + '\n' for s in statements))
+
+    def test_plan(self):
+        statements = neo4j.parse(self.data)
+        plan = neo4j.plan(iter(self.data))
+
+        self.assertEqual(plan['statements'], len(statements))
+        self.assertEqual(plan['nodes'], 6)
+        self.assertEqual(plan['rels'], 5)
+        self.assertEqual(plan['transactions'], 1)
+        self.assertEqual(plan['bytes'], len(dumpb({
+            'statements': [{'statement': ' '.join(statements)}]})))
+        self.assertEqual(plan['operations']['nodes'],
+                         {'MERGE': 1, 'CREATE': 5})
+        self.assertEqual(plan['labels'], {'Special': 1})
+        self.assertEqual(plan['types'], {'NEXT': 5})
+        self.assertEqual(len(plan['warnings']), 1)
+
+        plan = neo4j.plan(convert_array_to_dict(self.data),
+                          indexes=[('Special', 'foo')])
+        self.assertEqual(plan['statements'], len(statements))
+        self.assertEqual(plan['warnings'], [])
+
+    def test_send_request(self):
+        stats = Stats()
+        transport = FakeTransport()
+        output = neo4j.load(self.data, uri='http://example.com/db/data/',
+                            stats=stats, transport=transport)
+
+        self.assertEqual(output, {'results': [], 'errors': []})
+
+        url, data, headers = transport.requests[0]
+        self.assertEqual(url, 'http://example.com/db/data/transaction/commit')
+        self.assertEqual(json.loads(data)['statements'][0]['statement'],
+                         ' '.join(neo4j.parse(self.data)))
+        self.assertEqual(stats.counts['bytes'], len(data))
+        self.assertEqual(stats.batches[0]['phase'], 'request')
+
     def test_load(self):
         output = neo4j.load(self.data, uri=NEO4J_ENDPOINT)
         self.assertFalse(output['errors'])
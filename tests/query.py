@@ -0,0 +1,154 @@
+from __future__ import unicode_literals, absolute_import
+
+import unittest
+from graphlib import Node
+from graphlib.graph import OUTGOING, INCOMING
+from graphlib.query import Matcher, match, parse
+
+
+class ParseTestCase(unittest.TestCase):
+    def test(self):
+        p = parse("(a:Person:Admin {name: 'Jane', age: -3, score: 1.5})"
+                  "-[r:KNOWS|:LIKES {since: 2010}]->(b)<-[:X]-()--(`c d`)")
+
+        self.assertEqual(len(p.nodes), 4)
+        self.assertEqual(p.nodes[0].var, 'a')
+        self.assertEqual(p.nodes[0].labels, ('Person', 'Admin'))
+        self.assertEqual(p.nodes[0].props,
+                         {'name': 'Jane', 'age': -3, 'score': 1.5})
+        self.assertEqual(p.nodes[2].var, None)
+        self.assertEqual(p.nodes[3].var, 'c d')
+
+        self.assertEqual(p.rels[0].var, 'r')
+        self.assertEqual(p.rels[0].types, ('KNOWS', 'LIKES'))
+        self.assertEqual(p.rels[0].props, {'since': 2010})
+        self.assertEqual(p.rels[0].direction, OUTGOING)
+        self.assertEqual(p.rels[1].direction, INCOMING)
+        self.assertEqual(p.rels[2].direction, None)
+        self.assertEqual(p.rels[2].types, None)
+
+        p = parse('({"a b": "x\\"y", ok: true, no: null})')
+        self.assertEqual(p.nodes[0].props,
+                         {'a b': 'x"y', 'ok': True, 'no': None})
+
+    def test_invalid(self):
+        for pattern in ('', '(a', '(a)-[:X]', '(a {x: })', '(a)<-->(b)',
+                        '(a) # (b)', '(a)-[:]->(b)', '(x)-[x]->(y)'):
+            self.assertRaises(ValueError, parse, pattern)
+
+
+class MatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.city = Node({'location': 'Philadelphia'}, labels=['City'])
+        self.boston = Node({'location': 'Boston'}, labels=['City'])
+        self.jane = Node({'name': 'Jane'}, labels=['Person'])
+        self.john = Node({'name': 'John'}, labels=['Person'])
+        self.bob = Node({'name': 'Bob'}, labels=['Person'])
+
+        self.jane.relate(self.city, 'LIVES_IN')
+        self.john.relate(self.city, 'LIVES_IN')
+        self.bob.relate(self.boston, 'LIVES_IN')
+        self.knows = self.jane.relate(self.john, 'KNOWS', {'since': 2010})
+        self.john.relate(self.bob, 'KNOWS')
+
+        self.matcher = Matcher(self.city)
+
+    def names(self, pattern, *vars):
+        return sorted(tuple(b[v]['name'] if 'name' in b[v] else
+                            b[v]['location'] for v in vars)
+                      for b in self.matcher.match(pattern))
+
+    def test_plan(self):
+        plan = self.matcher.plan("(a:Person)-[:LIVES_IN]->"
+                                 "(c {location: 'Philadelphia'})")
+        self.assertEqual(plan['anchor'], 1)
+        self.assertEqual(plan['source'], 'index')
+        self.assertEqual(plan['key'], 'location')
+        self.assertEqual(plan['candidates'], 1)
+
+        plan = self.matcher.plan('(c:City)<-[:LIVES_IN]-(a:Person)')
+        self.assertEqual(plan['anchor'], 0)
+        self.assertEqual(plan['source'], 'label')
+        self.assertEqual(plan['candidates'], 2)
+
+        plan = self.matcher.plan('(a)-->(b)-->(c {name: "Bob"})')
+        self.assertEqual(plan['anchor'], 2)
+        self.assertEqual(plan['order'], [1, 0])
+
+        plan = self.matcher.plan('(a)-->(b)')
+        self.assertEqual(plan['source'], 'scan')
+        self.assertEqual(plan['candidates'], 5)
+
+    def test_match(self):
+        bindings = list(self.matcher.match(
+            "(a:Person)-[r:LIVES_IN]->(c {location: 'Philadelphia'})"))
+
+        self.assertEqual(len(bindings), 2)
+        self.assertEqual({b['a'] for b in bindings}, {self.jane, self.john})
+        self.assertTrue(all(b['c'] is self.city for b in bindings))
+        self.assertTrue(all(b['r'].end is self.city for b in bindings))
+
+        # Directions
+        self.assertEqual(self.names('(a)-[:KNOWS]->(b)', 'a', 'b'),
+                         [('Jane', 'John'), ('John', 'Bob')])
+        self.assertEqual(self.names('(a)<-[:KNOWS]-(b)', 'a', 'b'),
+                         [('Bob', 'John'), ('John', 'Jane')])
+        self.assertEqual(len(self.names('(a)-[:KNOWS]-(b)', 'a', 'b')), 4)
+
+        # Rel properties and any type
+        self.assertEqual(self.names('(a)-[{since: 2010}]->(b)', 'a', 'b'),
+                         [('Jane', 'John')])
+        self.assertEqual(self.names('(a {name: "John"})-->(b)', 'b'),
+                         [('Bob',), ('Philadelphia',)])
+
+        # Expands backwards from the anchor
+        self.assertEqual(
+            self.names('(a)-[:KNOWS]->(b)-[:LIVES_IN]->(c {location: '
+                       '"Boston"})', 'a', 'b'), [('John', 'Bob')])
+
+        # Rels are matched once per path
+        self.assertEqual(
+            self.names('(a)-[:LIVES_IN]->(c:City)<-[:LIVES_IN]-(b)', 'a', 'b'),
+            [('Jane', 'John'), ('John', 'Jane')])
+
+        # Repeated variables are bound to the same node
+        self.jane.relate(self.bob, 'KNOWS')
+        matcher = Matcher(self.city)
+        bindings = list(matcher.match('(a)-[:KNOWS]->(b)-[:KNOWS]->(c)'
+                                      '<-[:KNOWS]-(a)'))
+        self.assertEqual(len(bindings), 1)
+        self.assertIs(bindings[0]['a'], self.jane)
+        self.assertIs(bindings[0]['c'], self.bob)
+
+        self.assertEqual(list(self.matcher.match('(a:Missing)-->(b)')), [])
+
+    def test_self_loop(self):
+        node = Node({'name': 'x'})
+        rel = node.relate(node, 'SELF')
+
+        self.assertEqual(len(list(match('(a)-[:SELF]-(a)', node))), 1)
+        self.assertEqual(len(list(match('(a)--(a)', node))), 1)
+        self.assertIs(next(match('(a)-[r]->(a)', node))['r'], rel)
+
+    def test_lazy(self):
+        bindings = self.matcher.match('(a:Person)')
+        self.assertEqual(next(bindings)['a'].labels, ['Person'])
+        self.assertEqual(len(list(bindings)), 2)
+
+    def test_bool(self):
+        a = Node({'v': True})
+        b = Node({'v': 1})
+        c = Node({'v': 0})
+        a.relate(b, 'R', {'v': False})
+        b.relate(c, 'R', {'v': 0})
+        matcher = Matcher(a)
+
+        # Booleans do not match numbers
+        self.assertEqual([m['a'] for m in matcher.match('(a {v: true})')],
+                         [a])
+        self.assertEqual([m['a'] for m in matcher.match('(a {v: 1})')], [b])
+        self.assertEqual(matcher.plan('(a {v: true})')['candidates'], 1)
+        self.assertEqual([m['r'].start for m in
+                          matcher.match('(a)-[r {v: false}]->(b)')], [a])
+        self.assertEqual([m['r'].start for m in
+                          matcher.match('(a)-[r {v: 0}]->(b)')], [b])
@@ -1,7 +1,10 @@
 from __future__ import unicode_literals, absolute_import
 
 import unittest
-from graphlib import Node, Serializer, serialize
+from graphlib import Node, Rel, Serializer, serialize, deserialize
+from graphlib.serializer import convert_array_to_dict, \
+    convert_dict_to_array, iter_array_to_dict, serialize_json, \
+    deserialize_json
 
 
 class SerializeTestCase(unittest.TestCase):
@@ -40,5 +43,288 @@ class SerializeTestCase(unittest.TestCase):
         self.assertEqual(len(s.items), 13)
         self.assertEqual(len(s.batches), 2)
 
+    def test_bounded(self):
+        n0, n1, n2, n3, n4 = [Node({'i': i}) for i in range(5)]
+
+        n0.relate(n1, 'OWNS')
+        n1.relate(n2, 'OWNS')
+        n2.relate(n3, 'OWNS')
+        n0.relate(n4, 'KNOWS')
+        n4.relate(n0, 'REFERS')
+
+        nodes = lambda items: [d['props']['i'] for d in items
+                               if 'type' not in d]
+        rels = lambda items: [d['type'] for d in items if 'type' in d]
+
+        self.assertCountEqual(nodes(serialize(n0)), [0, 1, 2, 3, 4])
+        self.assertCountEqual(nodes(serialize(n0, max_depth=0)), [0])
+
+        items = serialize(n0, max_depth=2, types=['OWNS', 'REFERS'])
+        self.assertCountEqual(nodes(items), [0, 1, 2, 4])
+        self.assertCountEqual(rels(items), ['OWNS', 'OWNS', 'REFERS'])
+
+        items = serialize(n0, types='OWNS', direction=-1)
+        self.assertEqual(nodes(items), [0])
+
+        items = serialize(n2, max_depth=1, direction=1)
+        self.assertCountEqual(nodes(items), [2, 3])
+
+    def test_grouped(self):
+        root = Node(labels=['Root'])
+        people = [Node({'i': i}, labels=['Person']) for i in range(3)]
+        places = [Node({'i': i}, labels=['Place']) for i in range(3)]
+
+        for person, place in zip(people, places):
+            root.relate(person, 'HAS')
+            person.relate(place, 'LIVES_IN')
+            place.relate(root, 'IN')
+
+        items = Serializer(grouped=True).serialize(root)
+        self.assertEqual(len(items), 16)
+
+        s = Serializer(grouped=True)
+        s.serialize(root)
+        self.assertEqual([len(b) for b in s.batches], [1, 3, 3, 3, 3, 3])
+
+        # Rels follow their nodes
+        for index, item in enumerate(s.items):
+            if 'type' in item:
+                self.assertLess(item['start'], index)
+                self.assertLess(item['end'], index)
+
+        # Each batch is a single label set or rel type
+        for batch in s.batches:
+            keys = {tuple(d.get('labels', ())) + (d.get('type'),)
+                    for d in batch}
+            self.assertEqual(len(keys), 1)
+
+        self.assertEqual(len(serialize(root, grouped=True)), 16)
+
+    def test_serialize_changes(self):
+        s = Serializer(track=True)
+        n0, n1, n2 = Node({'i': 0}), Node({'i': 1}), Node({'i': 2})
+        r0 = n0.relate(n1, 'A')
+        r1 = n1.relate(n2, 'B')
+
+        self.assertEqual(len(s.serialize(n0)), 5)
+
+        # No changes
+        changes = s.serialize_changes()
+        self.assertEqual(changes, {'added': [], 'changed': [],
+                                   'removed': []})
+
+        n0['name'] = 'a'
+        del n1['i']
+        r0.update({'w': 1})
+        n1.unrelate(n2, 'B')
+        n3 = Node({'i': 3})
+        r2 = n2.relate(n3, 'C')
+        n4 = Node({'i': 4})
+        r3 = n0.relate(n4, 'D')
+
+        changes = s.serialize_changes()
+        self.assertEqual(changes['changed'], [
+            {'props': {'i': 0, 'name': 'a'}},
+            {'props': {}},
+            {'start': 0, 'end': 1, 'type': 'A', 'props': {'w': 1}},
+        ])
+        self.assertEqual(changes['removed'], [
+            {'start': 1, 'end': 3, 'type': 'B', 'props': {}},
+        ])
+        self.assertEqual(len(changes['added']), 4)
+        self.assertCountEqual([d.get('type') for d in changes['added']],
+                              [None, None, 'C', 'D'])
+
+        # Changed items are updated in the full output
+        self.assertEqual(s.items[s.indexes[n0]]['props']['name'], 'a')
+        self.assertIn(r2, s.indexes)
+        self.assertIn(r3, s.indexes)
+        self.assertNotIn(r1, s.indexes)
+
+        # Changes are cleared at each call
+        self.assertEqual(s.serialize_changes()['changed'], [])
+
+        # Items added and removed between calls are not output
+        n5 = Node()
+        n4.relate(n5, 'E')
+        n4.unrelate(n5)
+        self.assertEqual(s.serialize_changes()['added'], [])
+
+        self.assertRaises(ValueError, Serializer().serialize_changes)
+
+    def test_serialize_changes_removed(self):
+        s = Serializer(track=True)
+        n0, n1, n2 = Node({'i': 0}), Node({'i': 1}), Node({'i': 2})
+        n0.relate(n1, 'A')
+        r1 = n1.relate(n2, 'B')
+        r2 = n0.relate(n2, 'C')
+
+        items = s.serialize(n0)
+        self.assertEqual(len(items), 6)
+        removed_index = s.indexes[r1]
+
+        positions = dict(s.indexes)
+
+        n1.unrelate(n2, 'B')
+        changes = s.serialize_changes()
+        self.assertEqual(changes['removed'][0]['type'], 'B')
+
+        # Removed rels leave holes so other positions do not change
+        self.assertEqual(len(s.items), 6)
+        self.assertIsNone(s.items[removed_index])
+        self.assertEqual(s.holes, 1)
+        self.assertEqual(sum(1 for b in s.batches for d in b if d), 5)
+        del positions[r1]
+        self.assertEqual(s.indexes, positions)
+
+        n3 = Node({'i': 3})
+        n2.relate(n3, 'D')
+        added = s.serialize_changes()['added']
+        self.assertEqual(added[-1]['start'], s.indexes[n2])
+
+        # Compacting drops the holes and updates the positions
+        s.compact()
+        self.assertEqual(s.holes, 0)
+        self.assertEqual(s.items, serialize(n0))
+        self.assertEqual(sum(len(b) for b in s.batches), len(s.items))
+        self.assertEqual(s.items[s.indexes[r2]]['type'], 'C')
+        self.assertLess(s.indexes[r2], removed_index)
+
+        # Tracking continues after compacting
+        n0.unrelate(n2, 'C')
+        self.assertEqual(s.serialize_changes()['removed'][0]['type'], 'C')
+        s.compact()
+        self.assertEqual(len(s.items), 6)
+        self.assertNotIn(None, s.items)
+        self.assertNotIn(None, [d for b in s.batches for d in b])
+
+    def test_serialize_changes_trackers(self):
+        n0 = Node({'i': 0})
+        n0.relate(Node(), 'A')
+
+        s0 = Serializer(track=True)
+        s0.serialize(n0)
+
+        # Items are tracked by one serializer at a time
+        s1 = Serializer(track=True)
+        self.assertRaises(ValueError, s1.serialize, n0)
+
+        s0.close()
+        s1 = Serializer(track=True)
+        s1.serialize(n0)
+
+        n0['i'] = 1
+        self.assertEqual(len(s1.serialize_changes()['changed']), 1)
+
+        # Label changes are recorded explicitly
+        n0.labels = ['Special']
+        self.assertEqual(s1.serialize_changes()['changed'], [])
+        s1.tracker.record_change(n0)
+        self.assertEqual(s1.serialize_changes()['changed'][0]['labels'],
+                         ['Special'])
+
+    def test_json(self):
+        n = Node({'name': 'a', 'big': 2 ** 70}, labels=['Special'])
+        n.relate(Node({'name': 'é'}), 'KNOWS')
+
+        data = serialize_json(n)
+        items = deserialize_json(data)
+
+        self.assertEqual(serialize(items[0]), serialize(n))
+        self.assertEqual(items[0]['big'], 2 ** 70)
+
+    def test_convert(self):
+        a = Node({'name': 'a'})
+        b = Node({'name': 'b'})
+        a.relate(b, 'KNOWS')
+        b.relate(Node({'name': 'c'}), 'KNOWS')
+
+        items = serialize(a)
+        original = [dict(item) for item in items]
+
+        data = convert_array_to_dict(items)
+        self.assertEqual(len(data['nodes']), 3)
+        self.assertEqual([(r['start'], r['end']) for r in data['rels']],
+                         [(0, 1), (1, 2)])
+
+        # The input is not modified
+        self.assertEqual(items, original)
+
+        self.assertEqual(convert_dict_to_array(data),
+                         [data['nodes'][0], data['nodes'][1],
+                          data['nodes'][2]] + data['rels'])
+        self.assertEqual(convert_array_to_dict(convert_dict_to_array(data)),
+                         data)
+
+        # Generator input is read once
+        pairs = list(iter_array_to_dict(item for item in items))
+        self.assertEqual([key for key, _ in pairs],
+                         [key for key, _ in iter_array_to_dict(items)])
+
+        # Rels must refer to preceding nodes
+        self.assertRaises(ValueError, convert_array_to_dict,
+                          [{}, {'start': 0, 'end': 2, 'type': 'X'}])
+        self.assertRaises(ValueError, convert_array_to_dict,
+                          [{}, {'start': 0, 'end': 0, 'type': 'X'},
+                           {'start': 0, 'end': 1, 'type': 'X'}])
+        self.assertRaises(ValueError, convert_dict_to_array,
+                          {'nodes': [{}], 'rels': [{'start': 0, 'end': 1,
+                                                    'type': 'X'}]})
+
+    def test_deserialize(self):
+        n = Node({'name': 'a'}, labels=['Special'], match_props=['name'])
+        o = Node({'name': 'b'})
+        r = n.relate(o, 'KNOWS', {'since': 2000}, update_props=['since'])
+        o.relate(n, 'KNOWS')
+        n.relate(o, 'LIKES').match_props = False
+
+        data = serialize(n)
+
+        for bulk in (True, False):
+            items = deserialize(data, bulk=bulk)
+            self.assertEqual(len(items), 5)
+            self.assertEqual(serialize(items[0]), data)
+
+            a = items[0]
+            self.assertIsInstance(a, Node)
+            self.assertEqual(a.labels, ['Special'])
+            self.assertEqual(a.match_props, ['name'])
+            self.assertEqual(len(a.rels()), 3)
+            self.assertEqual(a.degree, 1)
+
+            rel = a.rels(type='KNOWS', outgoing=True)[0]
+            self.assertIsInstance(rel, Rel)
+            self.assertEqual(rel.update_props, ['since'])
+            self.assertEqual(rel.props, r.props)
+
+            # Props are not shared with the input
+            for d in data:
+                self.assertIsNot(rel.props, d['props'])
+
+        # Dict format
+        result = deserialize(convert_array_to_dict(serialize(n)))
+        self.assertEqual(len(result['nodes']), 2)
+        self.assertEqual(len(result['rels']), 3)
+        self.assertEqual(serialize(result['nodes'][0]), data)
+
+        # Duplicate rels update the existing one
+        items = deserialize([{}, {}, {'start': 0, 'end': 1, 'type': 'X'},
+                             {'start': 0, 'end': 1, 'type': 'X',
+                              'props': {'a': 1}}])
+        self.assertIs(items[2], items[3])
+        self.assertEqual(items[2].props, {'a': 1})
+
+        # Both paths apply the match and update keys of duplicates
+        data = [{}, {}, {'start': 0, 'end': 1, 'type': 'X'},
+                {'start': 0, 'end': 1, 'type': 'X', 'props': {'a': 1},
+                 'match': ['a'], 'update': ['a']}]
+
+        for bulk in (True, False):
+            rel = deserialize(data, bulk=bulk)[2]
+            self.assertEqual(rel.match_props, ['a'])
+            self.assertEqual(rel.update_props, ['a'])
+
+        self.assertRaises(ValueError, deserialize, None)
+
     def test_serialize(self):
         self.assertTrue(serialize(Node()))
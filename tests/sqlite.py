@@ -0,0 +1,162 @@
+from __future__ import unicode_literals, absolute_import
+
+import os
+import gc
+import shutil
+import tempfile
+import unittest
+from graphlib import Node, serialize, relate_many
+from graphlib.neo4j import parse
+from graphlib.sqlite import Store, StoredNode, StoredRel
+
+
+class StoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'graph.db')
+        self.store = Store(self.path, cache_size=2)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.dir)
+
+    def test_relate(self):
+        s = self.store
+        a = s.create({'name': 'a'}, labels=['Person'])
+        b = s.create({'name': 'b'})
+        c = s.create({'name': 'c'})
+
+        r = a.relate(b, 'KNOWS', {'since': 2010})
+        a.relate(c, 'KNOWS')
+        c.relate(a, 'LIKES')
+
+        self.assertIsInstance(a, StoredNode)
+        self.assertEqual(len(s), 3)
+        self.assertEqual(a.degree, 2)
+        self.assertEqual(len(a.rels(type='KNOWS')), 2)
+        self.assertCountEqual(b.neighbors, [a])
+        self.assertTrue(c.related(a, 'LIKES'))
+
+        # Relating to a node not in the store fails
+        self.assertRaises(ValueError, a.relate, Node(), 'KNOWS')
+        self.assertRaises(TypeError, StoredNode)
+
+        # Relating again updates the existing rel
+        self.assertIs(a.relate(b, 'KNOWS', {'since': 2011}), r)
+        self.assertEqual(r['since'], 2011)
+
+        self.assertEqual(a.unrelate(c, 'KNOWS'), 1)
+        self.assertEqual(len(a.rels(direction=1)), 1)
+
+    def test_persist(self):
+        s = self.store
+        a = s.create({'name': 'a'}, labels=['Person'], match_props=['name'])
+        b = s.create({'name': 'b'})
+        a.relate(b, 'KNOWS', {'since': 2010})
+        a['age'] = 30
+        ids = a.id, b.id
+        s.commit()
+        s.close()
+
+        s = self.store = Store(self.path)
+        a, b = [s.get(id) for id in ids]
+
+        self.assertEqual(a.props, {'name': 'a', 'age': 30})
+        self.assertEqual(a.labels, ['Person'])
+        self.assertEqual(a.match_props, ['name'])
+
+        r = a.rels(b)[0]
+        self.assertEqual(r.type, 'KNOWS')
+        self.assertEqual(r['since'], 2010)
+
+        # Identity is preserved across both ends
+        self.assertIs(b.rels(a)[0], r)
+        self.assertRaises(KeyError, s.get, 100)
+
+    def test_cache(self):
+        s = self.store
+        nodes = [s.create({'i': i}) for i in range(5)]
+
+        for n0, n1 in zip(nodes, nodes[1:]):
+            n0.relate(n1, 'NEXT')
+
+        loaded = [n for n in nodes if '_outgoing' in n.__dict__]
+        self.assertEqual(len(loaded), 2)
+
+        # Evicted nodes reload their rels on access
+        self.assertEqual(nodes[0].degree, 1)
+        self.assertEqual(nodes[2].degree, 2)
+
+        ids = [n.id for n in nodes]
+        del nodes, loaded, n0, n1
+        gc.collect()
+
+        # Only the cached nodes and their neighbors remain in memory
+        self.assertEqual(len(s._nodes), 4)
+
+        # Traversal loads nodes on demand
+        start = s.get(ids[0])
+        self.assertEqual([n['i'] for n in start.traverse()], list(range(5)))
+
+    def test_relate_many(self):
+        s = self.store
+        a, b = s.create({'i': 0}), s.create({'i': 1})
+
+        # Rels added in bulk are persisted
+        rel, = relate_many([(a, b, 'KNOWS', {'w': 1})])
+        self.assertIsInstance(rel, StoredRel)
+        self.assertIsNotNone(rel.id)
+        self.assertIs(relate_many([(a, b, 'KNOWS')])[0], rel)
+
+        s.clear()
+        self.assertEqual(b.rels(a, incoming=True)[0]['w'], 1)
+        self.assertEqual(s.conn.execute('SELECT count(*) FROM rels')
+                         .fetchone()[0], 1)
+
+    def test_recently_used(self):
+        s = self.store
+        a, b, c = s.create(), s.create(), s.create()
+        s.clear()
+
+        # Accessing the rels of a cached node keeps it in the cache
+        for node in (a, b, a, c):
+            self.assertEqual(node.degree, 0)
+
+        self.assertIn('_outgoing', a.__dict__)
+        self.assertNotIn('_outgoing', b.__dict__)
+        self.assertEqual(list(s._cache), [a.id, c.id])
+
+    def test_delete(self):
+        s = self.store
+        a = s.create()
+        b = s.create()
+        a.relate(b, 'KNOWS')
+
+        s.delete(a)
+
+        self.assertEqual(len(s), 1)
+        self.assertEqual(b.degree, 0)
+        self.assertEqual(len(list(s.items())), 1)
+
+    def test_items(self):
+        s = self.store
+        a = s.create({'name': 'a'}, labels=['Person'], match_props=['name'])
+        b = s.create({'name': 'b'})
+        a.relate(b, 'KNOWS', {'since': 2010})
+
+        items = list(s.items())
+
+        self.assertEqual(items, [
+            {'props': {'name': 'a'}, 'labels': ['Person'],
+             'match': ['name']},
+            {'props': {'name': 'b'}},
+            {'start': 0, 'end': 1, 'type': 'KNOWS',
+             'props': {'since': 2010}},
+        ])
+
+        # Same content as the object serializer
+        self.assertCountEqual(
+            [sorted(d.items()) for d in items],
+            [sorted(d.items()) for d in serialize(a)])
+
+        self.assertEqual(len(parse(s.items())), 3)
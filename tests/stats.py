@@ -0,0 +1,43 @@
+from __future__ import unicode_literals, absolute_import
+
+import unittest
+from graphlib import Node, Serializer
+from graphlib.stats import Stats
+
+
+class StatsTestCase(unittest.TestCase):
+    def test_stats(self):
+        batches = []
+        stats = Stats(callback=lambda stats, batch: batches.append(batch))
+
+        with stats.timer('encode'):
+            pass
+
+        stats.add_time('encode', 1)
+        stats.incr('bytes', 10)
+        stats.add_batch('request', 4, 2.0, 10)
+        stats.add_batch('request', 2, 1.0, 5)
+
+        self.assertGreaterEqual(stats.times['encode'], 1)
+        self.assertEqual(batches[0], {'phase': 'request', 'items': 4,
+                                      'seconds': 2.0, 'throughput': 2.0,
+                                      'bytes': 10})
+
+        summary = stats.summary()
+        self.assertEqual(summary['counts'], {'bytes': 10})
+        self.assertEqual(summary['batches']['request'],
+                         {'batches': 2, 'items': 6, 'seconds': 3.0,
+                          'throughput': 2.0})
+
+    def test_serializer(self):
+        stats = Stats()
+        s = Serializer(stats=stats)
+        n = Node()
+        n.relate([Node(), Node()], 'X')
+
+        s.serialize(n)
+        s.serialize(n.relate(Node(), 'Y'))
+
+        self.assertEqual(stats.counts, {'nodes': 4, 'rels': 3})
+        self.assertEqual([b['items'] for b in stats.batches], [5, 2])
+        self.assertIn('serialize', stats.times)
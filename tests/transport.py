@@ -0,0 +1,150 @@
+from __future__ import unicode_literals, absolute_import
+
+import json
+import time
+import socket
+import threading
+import unittest
+from graphlib.transport import HTTPTransport, FakeTransport, \
+    TransportError, _dropped
+
+try:
+    import http.client as httplib
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+except ImportError:
+    import httplib
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class Handler(BaseHTTPRequestHandler):
+    # Keep-alive requires HTTP/1.1
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        length = int(self.headers['content-length'])
+        data = self.rfile.read(length)
+        self.server.paths.append(self.path)
+
+        # Closes the connection without a response.
+        if self.path == '/drop':
+            self.close_connection = True
+            return
+
+        body = json.dumps({
+            'path': self.path,
+            'data': data.decode('utf-8'),
+            'client': list(self.client_address),
+        }).encode('utf-8')
+
+        self.send_response(500 if self.path == '/error' else 200)
+        self.send_header('content-type', 'application/json')
+        self.send_header('content-length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        # Closes the connection after a keep-alive response as a server
+        # does when it is idle.
+        if self.path == '/idle':
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+class HTTPTransportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.server.paths = []
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       args=(0.01,))
+        self.thread.daemon = True
+        self.thread.start()
+        self.url = 'http://127.0.0.1:{}'.format(self.server.server_port)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_post(self):
+        t = HTTPTransport(timeout=5)
+
+        first = json.loads(t.post(self.url + '/a', '{"x": 1}', {}).decode())
+        second = json.loads(t.post(self.url + '/b?q=1', b'{}', {}).decode())
+
+        self.assertEqual(first['path'], '/a')
+        self.assertEqual(first['data'], '{"x": 1}')
+        self.assertEqual(second['path'], '/b?q=1')
+
+        # Same connection is reused
+        self.assertEqual(first['client'], second['client'])
+
+        self.assertRaises(TransportError, t.post, self.url + '/error', '', {})
+        t.close()
+
+    def test_idle(self):
+        t = HTTPTransport(timeout=5)
+        first = json.loads(t.post(self.url + '/idle', '', {}).decode())
+
+        conn = list(t._connections.values())[0]
+        deadline = time.time() + 5
+
+        while not _dropped(conn) and time.time() < deadline:
+            time.sleep(0.01)
+
+        # A new connection is opened in place of the closed one
+        second = json.loads(t.post(self.url + '/a', '', {}).decode())
+        self.assertNotEqual(first['client'], second['client'])
+        self.assertEqual(self.server.paths, ['/idle', '/a'])
+        t.close()
+
+    def test_not_retried(self):
+        t = HTTPTransport(timeout=5)
+        t.post(self.url + '/a', '', {})
+
+        # Requests that were sent are not retried
+        self.assertRaises((httplib.HTTPException, socket.error), t.post,
+                          self.url + '/drop', '', {})
+        self.assertEqual(self.server.paths, ['/a', '/drop'])
+        self.assertEqual(t._connections, {})
+        t.close()
+
+    def test_threads(self):
+        t = HTTPTransport(timeout=5)
+        clients = {}
+
+        def run(i):
+            clients[i] = [json.loads(t.post(self.url, '', {}).decode())
+                          ['client'] for _ in range(3)]
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(4)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Each thread reuses its own connection
+        self.assertEqual(len(clients), 4)
+        self.assertTrue(all(c[0] == c[1] == c[2] for c in clients.values()))
+        self.assertEqual(len({tuple(c[0]) for c in clients.values()}), 4)
+
+        t.close()
+        self.assertTrue(all(not p for p in t._pools))
+
+
+class FakeTransportTestCase(unittest.TestCase):
+    def test_post(self):
+        t = FakeTransport()
+        self.assertEqual(json.loads(t.post('/', '{}', {}).decode()),
+                         {'results': [], 'errors': []})
+
+        t = FakeTransport(lambda url, data, headers: {'url': url})
+        self.assertEqual(json.loads(t.post('/x', '{}', {}).decode()),
+                         {'url': '/x'})
+        self.assertEqual(len(t.requests), 1)